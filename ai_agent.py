@@ -1,38 +1,380 @@
 import random
-import collections
 import time
 
+from bitboard import NUM_MOVES, NUM_WALLS, WALL_MOVE_BASE, cell_index, wall_coords, wall_id
+from distance_field import DistanceField
+from endgame import SOLVE_MS, EndgameSolver
+from search_stats import SearchStats
+from transposition import (EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable,
+                           move_key, zobrist_hash)
+
+MAX_SEARCH_DEPTH = 20  # Iterative deepening never goes past this
+MCTS_PLAYOUTS = 2000   # Per move, for the MCTS engine without a time budget
+
+# Packed wall move -> move tuple, shared by every search
+WALL_MOVES = [('wall', *wall_coords(w)) for w in range(NUM_WALLS)]
+
+
+def pack_move(move):
+    """Move tuple -> packed int (the QuoridorGame.legal_moves encoding)."""
+    if move[0] == 'move': return move[1] * 9 + move[2]
+    return WALL_MOVE_BASE + wall_id(move[1], move[2], move[3])
+
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when the move's time budget runs out."""
+
+
+class SearchCancelled(SearchTimeout):
+    """Raised inside minimax after request_stop(); get_move lets it propagate."""
+
+
 class QuoridorAI:
-    def __init__(self, game, player_id=2, difficulty='Hard'):
+    def __init__(self, game, player_id=2, difficulty='Hard', tt_size=1 << 16, tt_policy='depth',
+                 time_budget_ms=None, workers=1, depth=None, beam_width=None, collect_stats=False,
+                 book=None, endgame=None, engine=None, playouts=None, mcts_nodes=None, verbose=False):
         self.game = game
         self.player_id = player_id
         self.opponent_id = 1 if player_id == 2 else 2
         self.difficulty = difficulty
+        self.verbose = verbose  # Print a line per move and the root scores (the GUI's console log)
         self.my_goal = 0 if player_id == 2 else 8
         self.opp_goal = 8 if player_id == 2 else 0
         
         # Optimization: Store standard openings
+        # (an opening_book.OpeningBook; while in book, get_move skips the search)
         self.move_count = 0
+        self.book = book
+
+        # Exact pawn-race solver once nobody has walls left (default: Hard and Expert)
+        if endgame is None: endgame = difficulty in ('Hard', 'Expert')
+        self.endgame = EndgameSolver() if endgame else None
+
+        # Per-player goal-distance maps, attached only while searching. The
+        # maps themselves are kept between searches and moved onto each new root
+        self.fields = None
+        self.warm_fields = None
 
-    def get_move(self):
-        start_time = time.time()
+        # Transposition table, indexed by a Zobrist key that apply_move/undo_move
+        # keep up to date. tt_size=0 turns it off; tt.stats() has the hit rates
+        self.tt = TranspositionTable(tt_size, tt_policy) if tt_size else None
+        self.hash = 0
+
+        # Search shape; None takes the difficulty's default (Medium 1/10, Hard 3/4).
+        # With a time budget, depth caps iterative deepening instead
+        self.depth = depth
+        self.beam_width = beam_width
+
+        # Per-move time budget. None keeps the fixed-depth search
+        self.time_budget_ms = time_budget_ms
+        self.deadline = None
+        self.stop_requested = False  # Set from another thread via request_stop()
+        self.root_scores = {}  # Root move -> score from the last completed search
+        self.nodes = 0         # minimax calls, accumulated until the caller resets it
+        self.evaluations = 0   # evaluate_state_quick/deep calls, likewise
+        self.completed_depth = 0
+
+        # Move ordering: two killer moves per ply and a history table per player
+        # (packed move -> cutoff credit), aged rather than reset between moves
+        self.root_depth = 0
+        self.killers = []
+        self.history = {}
+        self.reset_ordering()
+
+        # collect_stats=True fills a SearchStats per get_move (see get_move_with_stats).
+        # Off, stats is None and the search pays one truth test per hook
+        self.collect_stats = collect_stats
+        self.stats = None
+        self.last_stats = None
+
+        # workers > 1 splits the root moves of deeper searches over a process pool
+        # (the MCTS engine instead grows one tree per worker)
+        self.workers = workers
+        self.parallel = None
+
+        # engine='mcts' searches with Monte Carlo tree search (mcts.py) instead of
+        # the beam minimax; the default is 'mcts' for Expert only. Without a time
+        # budget it runs a fixed number of playouts. Its tree carries over between
+        # moves until reset()
+        if engine is None: engine = 'mcts' if difficulty == 'Expert' else 'minimax'
+        if engine not in ('minimax', 'mcts'): raise ValueError(f"Unknown engine: {engine}")
+        self.engine = engine
+        self.playouts = playouts or MCTS_PLAYOUTS
+        self.mcts_nodes = mcts_nodes
+        self.mcts = None
+
+    def get_move(self, time_budget_ms=None, age=True):
+        """The AI's move in the current position.
+
+        age=False keeps the move-ordering tables as they are: for searches
+        that are not the AI's next move in its game (pondering a guessed reply
+        after the first, positions from unrelated games).
+        """
+        if age: self.age_ordering()
+        self.stats = SearchStats() if self.collect_stats else None
+        self.game.stats = self.stats  # Move generation counts its path searches too
+        try:
+            move = self.search_move(time_budget_ms)
+        finally:
+            self.game.stats = None
+        if self.stats:
+            self.stats.finish(move, self.root_scores)
+            self.last_stats, self.stats = self.stats, None
+        return move
+
+    def get_move_with_stats(self, time_budget_ms=None, age=True):
+        """(move, SearchStats) for one search, even if collect_stats is off."""
+        collect, self.collect_stats = self.collect_stats, True
+        try:
+            move = self.get_move(time_budget_ms, age)
+        finally:
+            self.collect_stats = collect
+        return move, self.last_stats
+
+    def search_move(self, time_budget_ms=None):
+        start_time = time.perf_counter()
         self.move_count += 1
-        print(f"AI Thinking... (Diff: {self.difficulty})")
+        budget = time_budget_ms if time_budget_ms is not None else self.time_budget_ms
+        if self.verbose: print(f"AI Thinking... (Diff: {self.difficulty})")
+        self.root_scores = {}  # Book moves report none
+        self.completed_depth = 0  # ...and no depth
+        if self.book and self.difficulty != 'Easy':
+            move = self.book.get_move(self.game, self.player_id)
+            if move: return move
+        if self.endgame and EndgameSolver.applies(self.game):
+            # A new wall layout costs a solve: only if the budget has room for it,
+            # otherwise search as usual while the table is built for later moves
+            if budget is None or budget >= SOLVE_MS or self.endgame.solved(self.game.board):
+                move, value = self.endgame.best_move(self.game)
+                if move:
+                    self.root_scores = {move: value}
+                    return move
+            else:
+                self.endgame.solve_in_background(self.game.board)
+        if self.tt: self.tt.new_search()
         
         if self.difficulty == 'Easy':
             return self.random_move()
+        if self.engine == 'mcts':
+            return self.mcts_move(budget)
+
+        beam_width = self.beam_width or (10 if self.difficulty == 'Medium' else 4)
+        if budget is not None:
+            return self.iterative_deepening(start_time + budget / 1000, beam_width,
+                                            max_depth=self.depth or MAX_SEARCH_DEPTH)
+        elif self.depth:
+            return self.minimax_root(depth=self.depth, beam_width=beam_width)
         elif self.difficulty == 'Medium':
-             return self.minimax_root(depth=1, beam_width=10)
+             return self.minimax_root(depth=1, beam_width=beam_width)
         else:
             # HARD MODE:
             # Uses Beam Search with Depth 3
             # Beam Width 4 means we only investigate the 4 best-looking moves deep down
-            return self.minimax_root(depth=3, beam_width=4)
+            return self.minimax_root(depth=3, beam_width=beam_width)
+
+    def iterative_deepening(self, deadline, beam_width, max_depth=MAX_SEARCH_DEPTH):
+        """Searches depth 1, 2, 3... until the deadline (a perf_counter time) passes.
+
+        Returns the best move of the deepest search that finished. Depth 1 always
+        runs to completion so there is a move even with a tiny budget.
+        """
+        best_move = None
+        self.completed_depth = 0
+        for depth in range(1, max_depth + 1):
+            iteration_start = time.perf_counter()
+            try:
+                move = self.minimax_root(depth, beam_width, deadline=deadline if depth > 1 else None)
+            except SearchCancelled:
+                raise
+            except SearchTimeout:
+                break
+            if move is None: break
+            best_move = move
+            self.completed_depth = depth
+
+            # Don't start an iteration that clearly cannot finish in time
+            now = time.perf_counter()
+            if now + (now - iteration_start) * 2 > deadline: break
+        return best_move
+
+    def minimax_root(self, depth, beam_width, deadline=None):
+        if self.workers > 1 and depth > 1:
+            return self.parallel_root(depth, beam_width, deadline)
+
+        stats = self.stats
+        if stats: nodes_before, started, completed = stats.nodes, time.perf_counter(), False
+        self.begin_search(deadline)
+        try:
+            candidates = self.root_candidates(beam_width)
+            if not candidates: return None
+            scores = self.score_root_moves(candidates, depth, beam_width)
+            completed = True
+        finally:
+            self.end_search()
+            if stats:
+                stats.iterations.append((depth, stats.nodes - nodes_before,
+                                         (time.perf_counter() - started) * 1000, completed))
+        return self.pick_root_move(candidates, scores)
+
+    def parallel_root(self, depth, beam_width, deadline=None):
+        """minimax_root with the candidate moves scored by worker processes."""
+        from parallel_search import RootSplitSearch
+
+        stats = self.stats
+        if stats: nodes_before, started, completed = stats.nodes, time.perf_counter(), False
+        self.begin_search()
+        try:
+            candidates = self.root_candidates(beam_width)
+        finally:
+            self.end_search()
+        if not candidates: return None
+
+        if self.parallel is None:
+            self.parallel = RootSplitSearch(self.workers, self.player_id, self.difficulty,
+                                            self.tt.size if self.tt else 0,
+                                            self.tt.policy if self.tt else 'depth')
+        try:
+            scores = self.parallel.score_root_moves(self.game, candidates, depth, beam_width, deadline,
+                                                    should_stop=lambda: self.stop_requested, stats=stats)
+            completed = True
+        finally:
+            self.nodes += self.parallel.nodes
+            if stats:
+                stats.iterations.append((depth, stats.nodes - nodes_before,
+                                         (time.perf_counter() - started) * 1000, completed))
+        return self.pick_root_move(candidates, scores)
+
+    def mcts_move(self, budget):
+        if self.mcts is None and self.workers > 1:
+            # One tree per worker in shared memory, merged by visits (parallel_mcts.py)
+            from mcts import DEFAULT_NODES
+            from parallel_mcts import RootParallelMCTS
+
+            self.mcts = self.parallel = RootParallelMCTS(self.game, self.player_id, self.workers,
+                                                         self.mcts_nodes or DEFAULT_NODES, self.endgame is not None)
+        elif self.mcts is None:
+            from mcts import DEFAULT_NODES, MCTS
+
+            self.mcts = MCTS(self.game, self.player_id, self.mcts_nodes or DEFAULT_NODES, endgame=self.endgame)
+        self.mcts.game = self.game
+        move = self.mcts.search(budget, None if budget is not None else self.playouts,
+                                should_stop=lambda: self.stop_requested)
+        self.nodes += self.mcts.iterations  # One playout counts as a node
+        if move is None: return None
+        self.root_scores = {self.game.decode_move(m): visits for m, (visits, _) in self.mcts.root_visits().items()}
+        return self.game.decode_move(move)
+
+    def reset_ordering(self):
+        self.killers = [[None, None] for _ in range(MAX_SEARCH_DEPTH + 1)]
+        self.history = {1: [0] * NUM_MOVES, 2: [0] * NUM_MOVES}
+
+    def age_ordering(self):
+        """Carries the ordering tables over to a search two plies further on.
+
+        History credit is halved so fresh cutoffs soon outweigh it; killers
+        move up two plies, to where the same positions now sit.
+        """
+        self.killers = self.killers[2:] + [[None, None], [None, None]]
+        for table in self.history.values():
+            for move, credit in enumerate(table):
+                if credit: table[move] = credit >> 1
+
+    def reset(self):
+        """Forgets everything kept from earlier searches (e.g. for a new game)."""
+        if self.tt: self.tt.clear()
+        self.reset_ordering()
+        self.root_scores = {}
+        self.warm_fields = None
+        if self.mcts: self.mcts.reset()
+
+    def sync(self, game=None):
+        """Call when the position jumped instead of moving on by play (undo, redo, load).
+
+        The killers assume the next search is two plies on, so they go. The
+        rest is kept: transposition entries are keyed on whole positions,
+        the distance maps follow whatever walls the board has, and history
+        credit, keyed by packed move alone, only steers move ordering. With
+        game, the AI is also rebound to that game.
+        """
+        if game is not None: self.game = game
+        if self.mcts: self.mcts.game = self.game
+        self.killers = [[None, None] for _ in range(MAX_SEARCH_DEPTH + 1)]
+        self.root_scores = {}
+
+    def order_moves(self, moves, player, ply, tt_move):
+        """Transposition move first, then killers, then by history score.
+
+        The sort is stable, so moves the heuristics know nothing about keep
+        the order they came in (the beam's evaluation order).
+        """
+        killers = self.killers[ply]
+        history = self.history[player]
+        def priority(move):
+            if move == tt_move: return 1 << 40
+            if move == killers[0]: return 1 << 39
+            if move == killers[1]: return 1 << 38
+            return history[pack_move(move)]
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def record_cutoff(self, move, player, ply, depth):
+        """A move refuted the node: remember it as a killer and credit its history."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1], killers[0] = killers[0], move
+        self.history[player][pack_move(move)] += depth * depth
+
+    def request_stop(self):
+        """Asks a running search (e.g. on another thread) to abort with SearchCancelled.
+
+        The flag stays set until the caller clears stop_requested.
+        """
+        self.stop_requested = True
+
+    def close(self):
+        """Shuts down the worker pool, if one was started."""
+        if self.parallel:
+            self.parallel.close()
+            if self.mcts is self.parallel: self.mcts = None
+            self.parallel = None
+
+    def begin_search(self, deadline=None):
+        """Prepares the search helpers (distance maps, hash, deadline) for the current position."""
+        self.attach_fields()
+        self.hash = zobrist_hash(self.game)
+        self.deadline = deadline
+
+    def end_search(self):
+        self.fields = None
+        self.deadline = None
+
+    def attach_fields(self):
+        """Distance maps for the current board; walls cut during search keep them in sync.
+
+        The previous search's maps are moved onto the new board, which only
+        regrows the layers the walls placed since then can affect.
+        """
+        board = self.game.board
+        if self.warm_fields is None:
+            self.warm_fields = {1: DistanceField(board, 8), 2: DistanceField(board, 0)}
+        else:
+            for field in self.warm_fields.values():
+                field.follow(board)
+        self.fields = self.warm_fields
+
+    def root_candidates(self, beam_width):
+        """The beam of root moves worth a deep search, best-looking first."""
+        stats = self.stats
+        if stats:
+            stats.node(0)
+            t0 = time.perf_counter()
 
-    def minimax_root(self, depth, beam_width):
         # 1. Generate ALL valid moves
         all_moves = self.get_all_valid_moves(self.player_id)
-        if not all_moves: return None
+        if stats:
+            t1 = time.perf_counter()
+            stats.movegen_time += t1 - t0
+        if not all_moves: return []
         
         # 2. Pre-Sort Moves (Heuristic Pruning)
         # We score moves superficially to pick the best candidates
@@ -43,43 +385,104 @@ class QuoridorAI:
             score = self.evaluate_state_quick() # Fast non-recursive score
             self.undo_move(move, self.player_id)
             scored_moves.append((score, move))
+        if stats: stats.eval_time += time.perf_counter() - t1
             
         # Sort best first
         scored_moves.sort(key=lambda x: x[0], reverse=True)
         
         # 3. Select only the top N candidates (The "Beam")
         best_candidates = [m[1] for m in scored_moves[:beam_width]]
-        
-        # 4. Run Deep Minimax on only these candidates
-        best_val = -float('inf')
-        best_move = best_candidates[0] # Default fallback
-        
+
+        # A previous (shallower) search knows better: try its moves in its order
+        previous = self.root_scores
+        if previous:
+            best_candidates.sort(key=lambda m: previous.get(m, -float('inf')), reverse=True)
+
+        # The last move's search may have been here already (two plies down its
+        # tree): its best move leads, as in minimax, even if the beam dropped it
+        elif self.tt:
+            entry = self.tt.probe(self.hash)
+            if entry and entry[4] in all_moves:
+                if entry[4] in best_candidates: best_candidates.remove(entry[4])
+                best_candidates.insert(0, entry[4])
+        return best_candidates
+
+    def score_root_moves(self, moves, depth, beam_width):
+        """Deep minimax score of each root move. Only the best one is exact;
+        the others may be upper bounds once alpha has risen."""
+        self.root_depth = depth
+        scores = {}
         alpha = -float('inf')
         beta = float('inf')
-
-        for move in best_candidates:
+        for index, move in enumerate(moves):
             self.apply_move(move, self.player_id)
-            val = self.minimax(depth - 1, False, alpha, beta, beam_width)
-            self.undo_move(move, self.player_id)
-            
-            print(f"Move {move} Score: {val}") # Debug info
-            
+            try:
+                # PVS: the first move gets the full window, the rest only have
+                # to prove they are no better, unless they fail high
+                if index == 0:
+                    val = self.minimax(depth - 1, False, alpha, beta, beam_width)
+                else:
+                    val = self.minimax(depth - 1, False, alpha, alpha + 1, beam_width)
+                    if val > alpha:
+                        val = self.minimax(depth - 1, False, alpha, beta, beam_width)
+            finally:
+                self.undo_move(move, self.player_id)
+            scores[move] = val
+            alpha = max(alpha, val)
+        return scores
+
+    def pick_root_move(self, candidates, scores):
+        best_val = -float('inf')
+        best_move = candidates[0] # Default fallback
+        for move in candidates:
+            val = scores[move]
+            if self.verbose: print(f"Move {move} Score: {val}") # Debug info
             if val > best_val:
                 best_val = val
                 best_move = move
-            
-            alpha = max(alpha, best_val)
         
+        self.root_scores = scores
         return best_move
 
     def minimax(self, depth, is_maximizing, alpha, beta, beam_width):
+        self.nodes += 1
+        stats = self.stats
+        ply = self.root_depth - depth
+        if stats: stats.node(ply)
+        if self.stop_requested:
+            raise SearchCancelled()
+        if self.deadline and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
         if depth == 0 or self.game.winner:
-            return self.evaluate_state_deep()
+            if not stats: return self.evaluate_state_deep()
+            t0 = time.perf_counter()
+            value = self.evaluate_state_deep()
+            stats.eval_time += time.perf_counter() - t0
+            return value
+
+        # Transposition lookup: a deep enough entry may settle this node outright
+        tt_move = None
+        alpha_orig, beta_orig = alpha, beta
+        if self.tt:
+            entry = self.tt.probe(self.hash)
+            if entry:
+                _, entry_depth, value, bound, tt_move, _ = entry
+                if entry_depth >= depth:
+                    if bound == EXACT or (bound == LOWER_BOUND and value >= beta) \
+                            or (bound == UPPER_BOUND and value <= alpha):
+                        if stats: stats.tt_cutoffs += 1
+                        return value
+                    if bound == LOWER_BOUND: alpha = max(alpha, value)
+                    else: beta = min(beta, value)
 
         player = self.player_id if is_maximizing else self.opponent_id
         
         # Generate moves
+        if stats: t0 = time.perf_counter()
         moves = self.get_all_valid_moves(player)
+        if stats:
+            t1 = time.perf_counter()
+            stats.movegen_time += t1 - t0
         if not moves: return self.evaluate_state_deep()
 
         # BEAM FILTERING INSIDE RECURSION
@@ -96,35 +499,73 @@ class QuoridorAI:
             # Sort: Max wants high score, Min wants low score
             scored_moves.sort(key=lambda x: x[0], reverse=is_maximizing)
             moves = [m[1] for m in scored_moves[:beam_width]]
+            if stats: stats.eval_time += time.perf_counter() - t1
+
+        # The stored best move is searched first, even if the beam dropped it;
+        # killers and history order the rest
+        if tt_move and tt_move not in moves: moves.append(tt_move)
+        moves = self.order_moves(moves, player, ply, tt_move)
 
+        # Principal variation search: after the first move, a null window
+        # around the bound only proves a move is no better; one that beats it
+        # is searched again with the full window
+        best_move = moves[0]
         if is_maximizing:
-            max_eval = -float('inf')
-            for move in moves:
+            best_eval = -float('inf')
+            for index, move in enumerate(moves):
                 self.apply_move(move, player)
-                eval_score = self.minimax(depth - 1, False, alpha, beta, beam_width)
-                self.undo_move(move, player)
-                max_eval = max(max_eval, eval_score)
+                try:
+                    if index == 0:
+                        eval_score = self.minimax(depth - 1, False, alpha, beta, beam_width)
+                    else:
+                        eval_score = self.minimax(depth - 1, False, alpha, alpha + 1, beam_width)
+                        if alpha < eval_score < beta:
+                            eval_score = self.minimax(depth - 1, False, alpha, beta, beam_width)
+                finally:
+                    self.undo_move(move, player)
+                if eval_score > best_eval:
+                    best_eval, best_move = eval_score, move
                 alpha = max(alpha, eval_score)
-                if beta <= alpha: break
-            return max_eval
+                if beta <= alpha:
+                    self.record_cutoff(move, player, ply, depth)
+                    if stats: stats.cutoff(index)
+                    break
         else:
-            min_eval = float('inf')
-            for move in moves:
+            best_eval = float('inf')
+            for index, move in enumerate(moves):
                 self.apply_move(move, player)
-                eval_score = self.minimax(depth - 1, True, alpha, beta, beam_width)
-                self.undo_move(move, player)
-                min_eval = min(min_eval, eval_score)
+                try:
+                    if index == 0:
+                        eval_score = self.minimax(depth - 1, True, alpha, beta, beam_width)
+                    else:
+                        eval_score = self.minimax(depth - 1, True, beta - 1, beta, beam_width)
+                        if alpha < eval_score < beta:
+                            eval_score = self.minimax(depth - 1, True, alpha, beta, beam_width)
+                finally:
+                    self.undo_move(move, player)
+                if eval_score < best_eval:
+                    best_eval, best_move = eval_score, move
                 beta = min(beta, eval_score)
-                if beta <= alpha: break
-            return min_eval
+                if beta <= alpha:
+                    self.record_cutoff(move, player, ply, depth)
+                    if stats: stats.cutoff(index)
+                    break
+
+        if self.tt:
+            if best_eval <= alpha_orig: bound = UPPER_BOUND
+            elif best_eval >= beta_orig: bound = LOWER_BOUND
+            else: bound = EXACT
+            self.tt.store(self.hash, depth, best_eval, bound, best_move)
+        return best_eval
 
     def evaluate_state_quick(self):
         """Fast evaluation for sorting moves (Distance Only)."""
+        self.evaluations += 1
         if self.game.winner == self.player_id: return 10000
         if self.game.winner == self.opponent_id: return -10000
         
-        my_dist = self.bfs_distance(self.game.player_positions[self.player_id], self.my_goal)
-        opp_dist = self.bfs_distance(self.game.player_positions[self.opponent_id], self.opp_goal)
+        my_dist = self.goal_distance(self.player_id)
+        opp_dist = self.goal_distance(self.opponent_id)
         
         # Penalize blocking yourself
         if my_dist >= 999: return -5000
@@ -134,14 +575,14 @@ class QuoridorAI:
 
     def evaluate_state_deep(self):
         """Detailed evaluation for leaf nodes."""
+        self.evaluations += 1
         if self.game.winner == self.player_id: return 10000
         if self.game.winner == self.opponent_id: return -10000
         
         my_pos = self.game.player_positions[self.player_id]
-        opp_pos = self.game.player_positions[self.opponent_id]
         
-        my_dist = self.bfs_distance(my_pos, self.my_goal)
-        opp_dist = self.bfs_distance(opp_pos, self.opp_goal)
+        my_dist = self.goal_distance(self.player_id)
+        opp_dist = self.goal_distance(self.opponent_id)
         
         if my_dist >= 999: return -5000 
         if opp_dist >= 999: return 5000
@@ -164,62 +605,21 @@ class QuoridorAI:
         return score
 
     def get_all_valid_moves(self, player_id):
-        moves = []
-        cur_r, cur_c = self.game.player_positions[player_id]
-        opp_id = 1 if player_id == 2 else 2
-        opp_pos = self.game.player_positions[opp_id]
-        
-        # 1. Pawn Moves
-        neighbors = self.game.board_graph[(cur_r, cur_c)]
-        for r, c in neighbors:
-            target = None
-            if (r, c) == opp_pos:
-                # Jump Logic
-                dr, dc = r - cur_r, c - cur_c
-                jump_dest = (r + dr, c + dc)
-                if jump_dest in self.game.board_graph[(r, c)]:
-                    target = jump_dest
-                else:
-                    for nr, nc in self.game.board_graph[(r, c)]:
-                        if (nr, nc) != (cur_r, cur_c):
-                            moves.append(('move', nr, nc, cur_r, cur_c))
-            else:
-                target = (r, c)
-            
-            if target:
-                moves.append(('move', target[0], target[1], cur_r, cur_c))
-
-        # 2. Wall Moves - SMART FILTERING
-        # Only check walls that might block the opponent's SHORTEST PATH
-        if self.game.walls_left[player_id] > 0:
-            opp_path = self.get_shortest_path_nodes(opp_id)
-            
-            # Identify "Cut Points"
-            # We check the first 5 steps of the opponent. 
-            # Trying to block them further away is usually useless.
-            urgent_steps = opp_path[:6] 
-            
-            checked_walls = set()
-            
-            for i in range(len(urgent_steps) - 1):
-                u, v = urgent_steps[i], urgent_steps[i+1]
-                blocking_walls = self.get_walls_blocking_edge(u, v)
-                
-                for w in blocking_walls:
-                    if w not in checked_walls:
-                        if self.is_valid_wall_sim(w[0], w[1], w[2]):
-                            moves.append(('wall', w[0], w[1], w[2]))
-                        checked_walls.add(w)
-
-        return moves
+        """The moves the search considers: every pawn move, plus the walls that
+        cut the first few steps of the opponent's shortest path (SMART FILTERING,
+        see QuoridorGame.legal_moves)."""
+        if self.stats: self.stats.movegen_calls += 1
+        fr, fc = self.game.player_positions[player_id]
+        return [('move', m // 9, m % 9, fr, fc) if m < WALL_MOVE_BASE else WALL_MOVES[m - WALL_MOVE_BASE]
+                for m in self.game.legal_moves(player_id, pruned=True)]
 
     
     def apply_move(self, move, player):
+        self.hash ^= move_key(move, player, self.game.walls_left[player])
         if move[0] == 'move':
             self.game.player_positions[player] = (move[1], move[2])
         elif move[0] == 'wall':
             r, c, o = move[1], move[2], move[3]
-            self.game.placed_walls.add((r, c, o))
             self.game.walls_left[player] -= 1
             self.cut_edges(r, c, o)
 
@@ -228,88 +628,36 @@ class QuoridorAI:
             self.game.player_positions[player] = (move[3], move[4])
         elif move[0] == 'wall':
             r, c, o = move[1], move[2], move[3]
-            self.game.placed_walls.remove((r, c, o))
             self.game.walls_left[player] += 1
             self.restore_edges(r, c, o)
+        self.hash ^= move_key(move, player, self.game.walls_left[player])
 
     def cut_edges(self, r, c, orientation):
-        if orientation == 'H': pairs = [((r,c), (r+1,c)), ((r,c+1), (r+1,c+1))]
-        else: pairs = [((r,c), (r,c+1)), ((r+1,c), (r+1,c+1))]
-        for u, v in pairs:
-            if v in self.game.board_graph[u]:
-                self.game.board_graph[u].remove(v); self.game.board_graph[v].remove(u)
+        self.game.board.place_wall(r, c, orientation)
+        if self.fields:
+            for field in self.fields.values():
+                field.wall_placed(r, c, orientation)
 
     def restore_edges(self, r, c, orientation):
-        if orientation == 'H': pairs = [((r,c), (r+1,c)), ((r,c+1), (r+1,c+1))]
-        else: pairs = [((r,c), (r,c+1)), ((r+1,c), (r+1,c+1))]
-        for u, v in pairs:
-            if not self.is_edge_blocked_by_any_wall(u, v):
-                self.game.board_graph[u].add(v); self.game.board_graph[v].add(u)
+        # Always the most recent cut during search, so the maps just roll back
+        self.game.board.remove_wall(r, c, orientation)
+        if self.fields:
+            for field in self.fields.values():
+                field.undo()
 
     def is_edge_blocked_by_any_wall(self, u, v):
-        r1, c1 = u; r2, c2 = v
-        if c1 == c2 and abs(r1 - r2) == 1:
-            rm = min(r1, r2)
-            if (rm, c1, 'H') in self.game.placed_walls or (rm, c1-1, 'H') in self.game.placed_walls: return True
-        if r1 == r2 and abs(c1 - c2) == 1:
-            cm = min(c1, c2)
-            if (r1, cm, 'V') in self.game.placed_walls or (r1-1, cm, 'V') in self.game.placed_walls: return True
-        return False
-
-    def is_valid_wall_sim(self, r, c, o):
-        if not (0 <= r < 8 and 0 <= c < 8): return False
-        if (r, c, 'H') in self.game.placed_walls or (r, c, 'V') in self.game.placed_walls: return False
-        if o == 'H':
-            if (r, c-1, 'H') in self.game.placed_walls or (r, c+1, 'H') in self.game.placed_walls: return False
-        else:
-            if (r-1, c, 'V') in self.game.placed_walls or (r+1, c, 'V') in self.game.placed_walls: return False
-        
-        self.cut_edges(r, c, o)
-        p1 = self.bfs_distance(self.game.player_positions[1], 8) < 900
-        p2 = self.bfs_distance(self.game.player_positions[2], 0) < 900
-        self.restore_edges(r, c, o)
-        return p1 and p2
+        return not self.game.board.is_open(cell_index(*u), cell_index(*v))
+
+    def goal_distance(self, player_id):
+        """Steps to goal for a player: a map lookup while searching, BFS otherwise."""
+        pos = self.game.player_positions[player_id]
+        if self.fields: return self.fields[player_id][cell_index(*pos)]
+        return self.bfs_distance(pos, 8 if player_id == 1 else 0)
 
     def bfs_distance(self, start_pos, goal_row):
-        queue = collections.deque([(start_pos, 0)])
-        visited = {start_pos}
-        while queue:
-            (r, c), dist = queue.popleft()
-            if r == goal_row: return dist
-            for n in self.game.board_graph[(r, c)]:
-                if n not in visited:
-                    visited.add(n)
-                    queue.append((n, dist + 1))
-        return 999
+        if self.stats: self.stats.bfs_calls += 1
+        return self.game.board.distance(cell_index(*start_pos), goal_row)
         
-    def get_shortest_path_nodes(self, player_id):
-        start = self.game.player_positions[player_id]
-        goal_row = 8 if player_id == 1 else 0
-        queue = collections.deque([[start]])
-        visited = {start}
-        while queue:
-            path = queue.popleft()
-            curr = path[-1]
-            if curr[0] == goal_row: return path
-            for neighbor in self.game.board_graph[curr]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    new_path = list(path)
-                    new_path.append(neighbor)
-                    queue.append(new_path)
-        return []
-
-    def get_walls_blocking_edge(self, u, v):
-        walls = []
-        r1, c1 = u; r2, c2 = v
-        if c1 == c2: 
-            min_r = min(r1, r2)
-            walls.append((min_r, c1, 'H')); walls.append((min_r, c1 - 1, 'H'))
-        elif r1 == r2:
-            min_c = min(c1, c2)
-            walls.append((r1, min_c, 'V')); walls.append((r1 - 1, min_c, 'V'))
-        return walls
-
     def random_move(self):
         moves = self.get_all_valid_moves(self.player_id)
         return random.choice(moves) if moves else None
\ No newline at end of file
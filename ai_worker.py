@@ -0,0 +1,166 @@
+"""Runs the AI search on a background thread so the GUI keeps drawing.
+
+The AI searches a private copy of the position, never the live game the GUI
+is rendering. A search can be cancelled at any time; the worker thread then
+stops at the next search node instead of finishing the move.
+
+With ponder_replies > 0 the same thread also works on the opponent's time:
+ponder() guesses the opponent's likeliest replies and searches the AI's
+answer to each in turn. When the real reply arrives, start() hands back a
+finished answer at once (a hit), adopts the search already running for it,
+or cancels the pondering and searches normally (a miss). Pondered searches
+also leave the AI's transposition table warm, so even a miss starts ahead.
+"""
+import threading
+
+from ai_agent import QuoridorAI, SearchCancelled
+
+
+class BackgroundSearch:
+    def __init__(self, ai, ponder_replies=0):
+        self.ai = ai                # Bound to its own QuoridorGame, not the GUI's
+        self.ponder_replies = ponder_replies
+        self.position = None        # Snapshot the running/finished search is for
+        self.pondering = False      # The thread is searching replies nobody has played yet
+        self.ponder_results = {}    # Snapshot after a guessed reply -> the AI's answer
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self._thread = None
+        self._busy = False          # A move was asked for and not yet taken
+        self._result = None
+        self._target = None         # Position the ponder thread is searching right now
+        self._aged = False          # Pondering already aged the AI's ordering for its coming move
+        self._age = True            # Whether the next real search ages it
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def active(self):
+        """True from start() until the result is taken or the search is cancelled."""
+        return self._busy
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def start(self, game):
+        """Starts searching the current position of game (or picks up the pondering for it)."""
+        position = game.snapshot()
+        with self._lock:
+            if self.pondering:
+                if position in self.ponder_results:
+                    move = self.ponder_results[position]
+                    self.ponder_hits += 1
+                elif position == self._target:
+                    # 1. Hit on the search in progress: let it finish as the real one
+                    self.pondering = False
+                    self.position = position
+                    self._busy = True
+                    self._aged = False
+                    self.ponder_hits += 1
+                    return
+                else:
+                    move = None
+                    self.ponder_misses += 1
+            else:
+                move = None
+        self.cancel()
+        self._age, self._aged = not self._aged, False
+
+        # 2. Hit on a finished answer: done at once, no thread
+        if move is not None:
+            self.position = position
+            self._result = move
+            self._busy = True
+            self._done.set()
+            return
+
+        # 3. Miss (or no pondering): search from scratch
+        self.position = position
+        self.ai.game.restore_snapshot(self.position)
+        self.ai.stop_requested = False
+        self._result = None
+        self._busy = True
+        self._done.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self.ai.get_move(age=self._age)
+        except SearchCancelled:
+            self._result = None
+        finally:
+            self._done.set()
+
+    def ponder(self, game):
+        """Searches answers to the opponent's likeliest replies while they think."""
+        if not self.ponder_replies or self._busy or self._thread is not None: return
+        self.ponder_results = {}
+        self.pondering = True
+        self.position = None
+        self.ai.stop_requested = False
+        self._result = None
+        self._done.clear()
+        self._thread = threading.Thread(target=self._ponder, args=(game.snapshot(),), daemon=True)
+        self._thread.start()
+
+    def predict_replies(self, position):
+        """The opponent's likeliest moves in position, best-looking first."""
+        ai = self.ai
+        ai.game.restore_snapshot(position)
+        guesser = QuoridorAI(ai.game, ai.opponent_id, 'Medium', tt_size=0, endgame=False)
+        guesser.begin_search()
+        try:
+            return guesser.root_candidates(self.ponder_replies)
+        finally:
+            guesser.end_search()
+
+    def _ponder(self, base):
+        ai = self.ai
+        try:
+            for reply in self.predict_replies(base):
+                # 1. Play the guessed reply on the AI's own board
+                game = ai.game
+                game.restore_snapshot(base)
+                ok = (game.move_pawn(ai.opponent_id, reply[1], reply[2]) if reply[0] == 'move'
+                      else game.place_wall(ai.opponent_id, reply[1], reply[2], reply[3]))
+                if not ok or game.winner: continue
+                position = game.snapshot()
+                with self._lock:
+                    if not self.pondering: return  # Adopted by start() meanwhile
+                    self._target = position
+                    # The guesses are all the AI's coming move: the first ages the ordering
+                    age, self._aged = not self._aged, True
+
+                # 2. Search the answer; start() may adopt it while it runs
+                move = ai.get_move(age=age)
+                with self._lock:
+                    self._target = None
+                    if not self.pondering:
+                        self._result = move
+                        return
+                    self.ponder_results[position] = move
+        except SearchCancelled:
+            self._result = None
+        finally:
+            with self._lock:
+                self._target = None
+            self._done.set()
+
+    def take_result(self):
+        """The finished search's move (or None), leaving the worker idle."""
+        if not self._busy or not self.done: return None
+        self._busy = False
+        self._thread = None
+        return self._result
+
+    def cancel(self):
+        """Stops an in-flight search or pondering and discards its result."""
+        if self._thread is not None:
+            self.ai.request_stop()
+            self._thread.join()
+        self._thread = None
+        self._busy = False
+        self._result = None
+        self.pondering = False
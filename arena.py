@@ -0,0 +1,180 @@
+"""Headless self-play arena: plays QuoridorAI configurations against each other.
+
+Example (200 games, Hard depth 3 vs. a 100 ms iterative-deepening budget):
+
+    python arena.py -n 200 -j 8 --a difficulty=Hard,depth=3 --b budget=100 -o results.jsonl
+
+Each finished game is written as one JSON line (to --out, or stdout) as soon
+as it completes; the summary (win rate with a Wilson interval, average plies
+and move latency percentiles) goes to stderr at the end. The two sides swap
+colours every game. With --archive the full games (moves, per-move think
+times, settings and result) are appended to a game_archive.py archive.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from ai_agent import QuoridorAI
+from game_archive import GameArchiveWriter
+from game_logic import QuoridorGame
+
+# --a/--b keys -> QuoridorAI keyword arguments
+SPEC_KEYS = {
+    'difficulty': ('difficulty', str),
+    'depth': ('depth', int),
+    'beam': ('beam_width', int),
+    'budget': ('time_budget_ms', float),
+    'tt': ('tt_size', int),
+    'policy': ('tt_policy', str),
+    'endgame': ('endgame', lambda v: v.lower() in ('1', 'true', 'yes', 'on')),
+    'engine': ('engine', str),
+    'playouts': ('playouts', int),
+    'nodes': ('mcts_nodes', int),
+}
+
+
+def parse_spec(text):
+    """'difficulty=Hard,depth=3' -> QuoridorAI kwargs."""
+    kwargs = {'difficulty': 'Hard'}
+    for item in filter(None, text.split(',')):
+        key, _, value = item.partition('=')
+        if key not in SPEC_KEYS:
+            raise argparse.ArgumentTypeError(f"Unknown AI setting '{key}' (expected one of {', '.join(SPEC_KEYS)})")
+        name, kind = SPEC_KEYS[key]
+        kwargs[name] = kind(value)
+    return kwargs
+
+
+def play_game(game_no, spec_a, spec_b, max_plies=200, seed=0):
+    """Plays one game and returns its result record. A is player 1 in even games."""
+    random.seed(seed + game_no)  # Easy AIs and tie-breaks are reproducible per game
+    game = QuoridorGame()
+    a_player = 1 if game_no % 2 == 0 else 2
+    sides = {a_player: 'A', 3 - a_player: 'B'}
+    ais = {a_player: QuoridorAI(game, a_player, **spec_a),
+           3 - a_player: QuoridorAI(game, 3 - a_player, **spec_b)}
+    latencies = {'A': [], 'B': []}
+    think_ms = []  # Per ply, for the archive
+    winner = None
+    forfeit = False
+
+    # 1. Play until someone wins or the ply cap calls it a draw
+    while not game.winner and len(game.history) < max_plies:
+        player = game.current_turn
+        started = time.perf_counter()
+        move = ais[player].get_move()
+        latencies[sides[player]].append((time.perf_counter() - started) * 1000)
+        think_ms.append(latencies[sides[player]][-1])
+
+        if move is None: ok = False
+        elif move[0] == 'move': ok = game.move_pawn(player, move[1], move[2])
+        else: ok = game.place_wall(player, move[1], move[2], move[3])
+        if not ok:
+            winner, forfeit = 3 - player, True  # No move or an illegal one loses
+            break
+
+    # 2. Record the result from A's point of view
+    winner = winner or game.winner
+    return {
+        'game': game_no,
+        'a_player': a_player,
+        'winner': sides[winner] if winner else None,
+        'forfeit': forfeit,
+        'plies': len(game.history),
+        'walls_left': {sides[p]: game.walls_left[p] for p in (1, 2)},
+        'latency_ms': latencies,
+        'moves': game.history.tolist(),
+        'think_ms': think_ms[:len(game.history)],
+    }
+
+
+def _play(args):
+    return play_game(*args)
+
+
+def wilson_interval(wins, n, z=1.96):
+    """Wilson score interval for a win rate (95% by default)."""
+    if n == 0: return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q in 0..100)."""
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(results):
+    n = len(results)
+    wins = sum(1 for r in results if r['winner'] == 'A')
+    losses = sum(1 for r in results if r['winner'] == 'B')
+    draws = n - wins - losses
+    score = wins + draws / 2  # Draws (ply cap) count as half a win
+    low, high = wilson_interval(score, n)
+    summary = {
+        'games': n, 'a_wins': wins, 'b_wins': losses, 'draws': draws,
+        'forfeits': sum(1 for r in results if r['forfeit']),
+        'a_score': score / n if n else 0.0,
+        'a_score_ci95': [low, high],
+        'avg_plies': sum(r['plies'] for r in results) / n if n else 0.0,
+        'latency_ms': {},
+    }
+    for side in 'AB':
+        times = [t for r in results for t in r['latency_ms'][side]]
+        summary['latency_ms'][side] = {
+            'moves': len(times),
+            'mean': sum(times) / len(times) if times else 0.0,
+            'p50': percentile(times, 50), 'p90': percentile(times, 90),
+            'p99': percentile(times, 99), 'max': max(times, default=0.0),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play QuoridorAI settings against each other without the GUI.")
+    parser.add_argument('-n', '--games', type=int, default=100)
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument('--a', type=parse_spec, default='difficulty=Hard',
+                        help="Side A, e.g. difficulty=Hard,depth=3,beam=4,budget=200")
+    parser.add_argument('--b', type=parse_spec, default='difficulty=Medium', help="Side B, same format")
+    parser.add_argument('--max-plies', type=int, default=200, help="Games this long are draws")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--out', help="JSONL file for per-game results (default: stdout)")
+    parser.add_argument('--archive', help="Also append every game (moves, think times, settings) to this game archive")
+    args = parser.parse_args(argv)
+
+    jobs = [(i, args.a, args.b, args.max_plies, args.seed) for i in range(args.games)]
+    out = open(args.out, 'w') if args.out else sys.stdout
+    archive = GameArchiveWriter(args.archive) if args.archive else None
+    start = QuoridorGame().snapshot()
+    results = []
+    try:
+        with Pool(args.workers) as pool:
+            for result in pool.imap_unordered(_play, jobs):
+                moves, think_ms = result.pop('moves'), result.pop('think_ms')
+                results.append(result)
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+                if archive is not None:
+                    meta = {k: v for k, v in result.items() if k != 'latency_ms'}  # think_ms has them per ply
+                    archive.append_moves(start, moves, think_ms, {'a': args.a, 'b': args.b, 'seed': args.seed, **meta})
+    finally:
+        if out is not sys.stdout: out.close()
+        if archive is not None: archive.close()
+
+    summary = summarize(results)
+    print(json.dumps({'a': args.a, 'b': args.b, **summary}, indent=2), file=sys.stderr)
+    return summary
+
+
+if __name__ == '__main__':
+    main()
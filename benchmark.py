@@ -0,0 +1,179 @@
+"""Micro-benchmarks for the rules and search hot paths.
+
+Runs every primitive on a fixed corpus of positions (opening, midgame with
+ten walls, endgame with all walls used) and reports microseconds per call,
+plus nodes/second and evaluations/second for a full minimax_root search:
+
+    python benchmark.py -o bench.json              # save a run
+    python benchmark.py --compare bench.json       # ...and later compare to it
+
+Timings are the best of several rounds, each repeated until it lasts at
+least --min-time seconds, so they are fairly stable on a quiet machine.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from ai_agent import QuoridorAI
+from bitboard import BitBoard, cell_index, iter_bits, wall_coords
+from game_logic import QuoridorGame
+
+# name -> (pawn positions, walls left, side to move, placed walls)
+CORPUS = {
+    'opening': ({1: (1, 4), 2: (7, 4)}, {1: 10, 2: 10}, 1, []),
+    'midgame': ({1: (2, 3), 2: (8, 7)}, {1: 3, 2: 7}, 1,
+                [(0, 2, 'V'), (1, 1, 'V'), (3, 1, 'V'), (4, 2, 'H'), (4, 3, 'V'),
+                 (4, 4, 'H'), (4, 6, 'H'), (4, 7, 'V'), (5, 7, 'H'), (6, 4, 'V')]),
+    'endgame': ({1: (4, 7), 2: (6, 3)}, {1: 0, 2: 0}, 1,
+                [(0, 2, 'V'), (1, 1, 'V'), (1, 3, 'H'), (1, 6, 'V'), (2, 2, 'V'),
+                 (2, 4, 'V'), (2, 5, 'V'), (2, 6, 'H'), (3, 1, 'V'), (3, 5, 'H'),
+                 (4, 2, 'H'), (4, 3, 'V'), (4, 4, 'H'), (4, 6, 'H'), (4, 7, 'V'),
+                 (5, 5, 'H'), (5, 7, 'H'), (6, 4, 'V'), (6, 5, 'H'), (7, 4, 'H')]),
+}
+
+SEARCH_DEPTH = 3
+SEARCH_BEAM = 4
+
+
+def load_position(name):
+    positions, walls_left, turn, walls = CORPUS[name]
+    game = QuoridorGame()
+    game.player_positions = dict(positions)
+    game.walls_left = dict(walls_left)
+    game.current_turn = turn
+    game.board = BitBoard()
+    for r, c, o in walls:
+        game.board.place_wall(r, c, o)
+    return game
+
+
+def time_call(fn, min_time, rounds=3):
+    """Best-of-rounds microseconds per fn() call."""
+    best = float('inf')
+    for _ in range(rounds):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time: break
+        best = min(best, elapsed / calls)
+    return best * 1e6
+
+
+def bench_position(name, min_time):
+    game = load_position(name)
+    player = game.current_turn
+    ai = QuoridorAI(game, player_id=player, difficulty='Hard')
+    goal = 8 if player == 1 else 0
+    start = cell_index(*game.player_positions[player])
+    moves = ai.get_all_valid_moves(player)
+    walls = [wall_coords(w) for w in iter_bits(game.board.available)]  # Free slots: the walls that need a path check
+
+    def keeps_paths():
+        for r, c, o in walls:
+            game._keeps_paths(r, c, o)
+
+    def movegen():
+        game.clear_legal_cache()  # Time the generator, not the cache
+        ai.get_all_valid_moves(player)
+
+    def legal_moves_all():
+        game.clear_legal_cache()
+        game.legal_moves(player)
+
+    def legal_moves_pruned():
+        game.clear_legal_cache()
+        game.legal_moves(player, pruned=True)
+
+    def apply_undo():
+        for move in moves:
+            ai.apply_move(move, player)
+            ai.undo_move(move, player)
+
+    results = {
+        'distance_us': time_call(lambda: game.board.distance(start, goal), min_time),
+        'get_all_valid_moves_us': time_call(movegen, min_time),
+        'legal_moves_all_us': time_call(legal_moves_all, min_time),
+        'legal_moves_pruned_us': time_call(legal_moves_pruned, min_time),
+    }
+    if walls: results['keeps_paths_us'] = time_call(keeps_paths, min_time) / len(walls)
+
+    # apply/undo as the search runs them: with the distance maps attached
+    ai.begin_search()
+    try:
+        results['apply_undo_move_us'] = time_call(apply_undo, min_time) / max(1, len(moves))
+    finally:
+        ai.end_search()
+
+    # A full fixed-depth search from a cold table, counting what it visits
+    def search():
+        ai.reset()
+        game.clear_legal_cache()
+        ai.minimax_root(SEARCH_DEPTH, SEARCH_BEAM)
+
+    ai.nodes = ai.evaluations = 0
+    search()
+    nodes, evaluations = ai.nodes, ai.evaluations
+    seconds = time_call(search, min_time) / 1e6
+    results.update({
+        'minimax_root_ms': seconds * 1000,
+        'nodes': nodes,
+        'evaluations': evaluations,
+        'nodes_per_sec': nodes / seconds,
+        'evals_per_sec': evaluations / seconds,
+        'moves': len(moves),
+    })
+    return results
+
+
+def run(min_time=0.2):
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'search': {'depth': SEARCH_DEPTH, 'beam': SEARCH_BEAM},
+        'positions': {name: bench_position(name, min_time) for name in CORPUS},
+    }
+
+
+def compare(report, baseline):
+    """Lines of 'metric: old -> new (ratio)' for every shared timing/throughput."""
+    lines = []
+    for name, metrics in report['positions'].items():
+        old = baseline.get('positions', {}).get(name, {})
+        for metric, value in metrics.items():
+            if metric not in old or not old[metric]: continue
+            if metric.endswith('_us') or metric.endswith('_ms'): speedup = old[metric] / value
+            elif metric.endswith('_per_sec'): speedup = value / old[metric]
+            else: continue
+            lines.append(f"{name:8} {metric:24} {old[metric]:12.2f} -> {value:12.2f}  x{speedup:.2f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Quoridor rules and search primitives.")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds per timing round")
+    parser.add_argument('-o', '--out', help="Write the JSON report here (default: stdout)")
+    parser.add_argument('--compare', help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.min_time)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)), file=sys.stderr)
+    return report
+
+
+if __name__ == '__main__':
+    main()
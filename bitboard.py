@@ -0,0 +1,333 @@
+"""Bitboard representation of the Quoridor board.
+
+Cells are numbered ``r * 9 + c`` and stored as bits of a Python int, so a set of
+cells is a single integer and a BFS layer is a handful of shifts and masks.
+Wall slots are numbered ``r * 8 + c`` (one mask per orientation) and the
+blocked edges are kept as two "open edge" masks:
+
+* ``down_open``  - bit ``i`` set when cell ``i`` connects to cell ``i + 9``
+* ``right_open`` - bit ``i`` set when cell ``i`` connects to cell ``i + 1``
+
+The wall geometry is precomputed once for all 128 walls, numbered by
+``wall_id`` (``slot`` for horizontal, ``64 + slot`` for vertical): which walls
+each one rules out, which edges it cuts and which walls cut each edge. A
+board keeps the mask of still-placeable walls up to date as walls come and go.
+
+For connectivity the board also tracks the wall *lattice points* (the 10x10
+grid corners, ``pr * 10 + pc``) that are on the border or touched by a wall.
+A wall seals off a region only if it closes a loop of walls and border, which
+it cannot do while touching that barrier at one point or none.
+"""
+from collections.abc import Mapping
+
+BOARD_SIZE = 9
+WALL_GRID = 8
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+UNREACHABLE = 999  # Same sentinel the BFS helpers have always returned
+
+ALL_CELLS = (1 << NUM_CELLS) - 1
+ROW_MASKS = [((1 << BOARD_SIZE) - 1) << (BOARD_SIZE * r) for r in range(BOARD_SIZE)]
+COL_MASKS = [sum(1 << (r * BOARD_SIZE + c) for r in range(BOARD_SIZE)) for c in range(BOARD_SIZE)]
+NOT_LAST_ROW = ALL_CELLS & ~ROW_MASKS[BOARD_SIZE - 1]
+NOT_LAST_COL = ALL_CELLS & ~COL_MASKS[BOARD_SIZE - 1]
+NUM_SLOTS = WALL_GRID * WALL_GRID
+NUM_WALLS = 2 * NUM_SLOTS
+ALL_WALLS = (1 << NUM_WALLS) - 1
+# Packed move encoding: 0..80 moves the pawn to that cell, WALL_MOVE_BASE + wall_id places a wall
+WALL_MOVE_BASE = NUM_CELLS
+NUM_MOVES = WALL_MOVE_BASE + NUM_WALLS
+POINT_GRID = BOARD_SIZE + 1
+BORDER_POINTS = sum(1 << (pr * POINT_GRID + pc) for pr in range(POINT_GRID) for pc in range(POINT_GRID)
+                    if pr in (0, BOARD_SIZE) or pc in (0, BOARD_SIZE))
+
+
+def cell_index(r, c):
+    return r * BOARD_SIZE + c
+
+
+def cell_coords(index):
+    return divmod(index, BOARD_SIZE)
+
+
+def slot_index(r, c):
+    return r * WALL_GRID + c
+
+
+def wall_id(r, c, orientation):
+    return slot_index(r, c) + (NUM_SLOTS if orientation == 'V' else 0)
+
+
+def wall_coords(wall):
+    """(r, c, orientation) of a wall id."""
+    slot = wall % NUM_SLOTS
+    return (slot // WALL_GRID, slot % WALL_GRID, 'V' if wall >= NUM_SLOTS else 'H')
+
+
+def iter_bits(mask):
+    """Yields the index of every set bit, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def wall_edge_bits(r, c, orientation):
+    """Bits of the open-edge mask (down for 'H', right for 'V') cut by a wall."""
+    i = cell_index(r, c)
+    if orientation == 'H':
+        return (1 << i) | (1 << (i + 1))
+    return (1 << i) | (1 << (i + BOARD_SIZE))
+
+
+def wall_edges(r, c, orientation):
+    """The two (cell, cell) index pairs a wall separates."""
+    i = cell_index(r, c)
+    if orientation == 'H':
+        return ((i, i + BOARD_SIZE), (i + 1, i + 1 + BOARD_SIZE))
+    return ((i, i + 1), (i + BOARD_SIZE, i + BOARD_SIZE + 1))
+
+
+def _build_wall_tables():
+    conflicts, cuts, points = [], [], []
+    down_edge_walls = [() for _ in range(NUM_CELLS)]
+    right_edge_walls = [() for _ in range(NUM_CELLS)]
+    for wall in range(NUM_WALLS):
+        r, c, o = wall_coords(wall)
+        # Same slot in either orientation (taken or crossed), plus the two
+        # same-orientation neighbours that would overlap it
+        rivals = [(r, c, 'H'), (r, c, 'V')]
+        if o == 'H': rivals += [(r, c - 1, 'H'), (r, c + 1, 'H')]
+        else: rivals += [(r - 1, c, 'V'), (r + 1, c, 'V')]
+        conflicts.append(sum(1 << wall_id(*w) for w in rivals
+                             if 0 <= w[0] < WALL_GRID and 0 <= w[1] < WALL_GRID))
+        cuts.append(wall_edge_bits(r, c, o))
+        # Both ends and the middle, on the corner lattice
+        if o == 'H': corners = [(r + 1, c + k) for k in range(3)]
+        else: corners = [(r + k, c + 1) for k in range(3)]
+        points.append(sum(1 << (pr * POINT_GRID + pc) for pr, pc in corners))
+    for i in range(NUM_CELLS):
+        # Walls listed in the order the AI has always tried them
+        r, c = cell_coords(i)
+        down_edge_walls[i] = tuple(wall_id(r, cc, 'H') for cc in (c, c - 1)
+                                   if r < WALL_GRID and 0 <= cc < WALL_GRID)
+        right_edge_walls[i] = tuple(wall_id(rr, c, 'V') for rr in (r, r - 1)
+                                    if c < WALL_GRID and 0 <= rr < WALL_GRID)
+    return conflicts, cuts, points, down_edge_walls, right_edge_walls
+
+
+# WALL_CONFLICTS[w]: walls that can't coexist with w (w included)
+# WALL_CUTS[w]:      bits of down_open ('H') or right_open ('V') that w cuts
+# WALL_POINTS[w]:    the three lattice points w runs through
+# DOWN_EDGE_WALLS[i] / RIGHT_EDGE_WALLS[i]: walls that cut the edge below / right of cell i
+WALL_CONFLICTS, WALL_CUTS, WALL_POINTS, DOWN_EDGE_WALLS, RIGHT_EDGE_WALLS = _build_wall_tables()
+
+
+def walls_cutting(a, b):
+    """Ids of the walls that would separate adjacent cells a and b."""
+    lo, hi = (a, b) if a < b else (b, a)
+    if hi - lo == BOARD_SIZE: return DOWN_EDGE_WALLS[lo]
+    if hi - lo == 1: return RIGHT_EDGE_WALLS[lo]
+    return ()
+
+
+class BitBoard:
+    __slots__ = ('h_walls', 'v_walls', 'down_open', 'right_open', 'available', 'barrier')
+
+    def __init__(self):
+        self.h_walls = 0  # Slot mask of horizontal walls
+        self.v_walls = 0  # Slot mask of vertical walls
+        self.down_open = NOT_LAST_ROW
+        self.right_open = NOT_LAST_COL
+        self.available = ALL_WALLS  # Wall-id mask of the walls no placed wall rules out
+        self.barrier = BORDER_POINTS  # Lattice points on the border or on a wall
+
+    @classmethod
+    def from_walls(cls, h_walls, v_walls):
+        """Board with the walls of two slot masks placed."""
+        board = cls()
+        for s in iter_bits(h_walls):
+            board.place_wall(s // WALL_GRID, s % WALL_GRID, 'H')
+        for s in iter_bits(v_walls):
+            board.place_wall(s // WALL_GRID, s % WALL_GRID, 'V')
+        return board
+
+    def copy(self):
+        other = BitBoard.__new__(BitBoard)
+        other.h_walls = self.h_walls
+        other.v_walls = self.v_walls
+        other.down_open = self.down_open
+        other.right_open = self.right_open
+        other.available = self.available
+        other.barrier = self.barrier
+        return other
+
+    # --- WALLS ---
+    def has_wall(self, r, c, orientation):
+        mask = self.h_walls if orientation == 'H' else self.v_walls
+        return bool(mask >> slot_index(r, c) & 1)
+
+    def walls(self):
+        """Yields every placed wall as an (r, c, orientation) tuple."""
+        for s in iter_bits(self.h_walls):
+            yield (s // WALL_GRID, s % WALL_GRID, 'H')
+        for s in iter_bits(self.v_walls):
+            yield (s // WALL_GRID, s % WALL_GRID, 'V')
+
+    def wall_conflicts(self, r, c, orientation):
+        """True if the slot is off the board, taken, crossed or overlapped."""
+        if not (0 <= r < WALL_GRID and 0 <= c < WALL_GRID): return True
+        return not self.available >> wall_id(r, c, orientation) & 1
+
+    def placed_mask(self):
+        """Wall-id mask of the placed walls."""
+        return self.h_walls | self.v_walls << NUM_SLOTS
+
+    def place_wall(self, r, c, orientation):
+        """Adds a wall and cuts its two edges. No rule checks."""
+        wall = wall_id(r, c, orientation)
+        bit = 1 << slot_index(r, c)
+        cut = WALL_CUTS[wall]
+        if orientation == 'H':
+            self.h_walls |= bit
+            self.down_open &= ~cut
+        else:
+            self.v_walls |= bit
+            self.right_open &= ~cut
+        self.available &= ~WALL_CONFLICTS[wall]
+        self.barrier |= WALL_POINTS[wall]
+
+    def remove_wall(self, r, c, orientation):
+        """Removes a wall and reopens its edges unless another wall still cuts them."""
+        wall = wall_id(r, c, orientation)
+        bit = 1 << slot_index(r, c)
+        reopen = WALL_CUTS[wall]
+        if orientation == 'H':
+            self.h_walls &= ~bit
+            for dc in (-1, 1):
+                if 0 <= c + dc < WALL_GRID and self.h_walls & (1 << slot_index(r, c + dc)):
+                    reopen &= ~wall_edge_bits(r, c + dc, 'H')
+            self.down_open |= reopen
+        else:
+            self.v_walls &= ~bit
+            for dr in (-1, 1):
+                if 0 <= r + dr < WALL_GRID and self.v_walls & (1 << slot_index(r + dr, c)):
+                    reopen &= ~wall_edge_bits(r + dr, c, 'V')
+            self.right_open |= reopen
+
+        # Conflicts are symmetric: a wall this one ruled out is placeable again
+        # unless another placed wall also rules it out
+        placed = self.placed_mask()
+        for other in iter_bits(WALL_CONFLICTS[wall]):
+            if not placed & WALL_CONFLICTS[other]:
+                self.available |= 1 << other
+        barrier = BORDER_POINTS
+        for other in iter_bits(placed):
+            barrier |= WALL_POINTS[other]
+        self.barrier = barrier
+
+    def cannot_disconnect(self, r, c, orientation):
+        """True if adding this wall provably leaves every cell's connectivity as is.
+
+        A wall touching the existing walls/border at one lattice point or none
+        only grows a dangling branch, never a closed loop. False means "maybe":
+        the caller still has to search.
+        """
+        touching = WALL_POINTS[wall_id(r, c, orientation)] & self.barrier
+        return touching & (touching - 1) == 0
+
+    # --- MOVEMENT ---
+    def is_open(self, a, b):
+        """True if adjacent cells a and b (indices) are not separated by a wall."""
+        lo, hi = (a, b) if a < b else (b, a)
+        if hi - lo == BOARD_SIZE: return bool(self.down_open >> lo & 1)
+        if hi - lo == 1: return bool(self.right_open >> lo & 1)
+        return False
+
+    def expand(self, mask):
+        """All cells one open step away from any cell in mask."""
+        down, right = self.down_open, self.right_open
+        return (((mask & down) << BOARD_SIZE) | ((mask >> BOARD_SIZE) & down) |
+                ((mask & right) << 1) | ((mask >> 1) & right))
+
+    def neighbors(self, index):
+        """Indices of the cells reachable in one step from index."""
+        # Bits past the last row/column are never set, so only the
+        # negative shifts need guarding
+        down, right = self.down_open, self.right_open
+        result = []
+        if index >= BOARD_SIZE and down >> (index - BOARD_SIZE) & 1: result.append(index - BOARD_SIZE)
+        if down >> index & 1: result.append(index + BOARD_SIZE)
+        if index and right >> (index - 1) & 1: result.append(index - 1)
+        if right >> index & 1: result.append(index + 1)
+        return result
+
+    def pawn_targets(self, cur, opp):
+        """Mask of cells a pawn on cur may move to with the opponent on opp."""
+        steps = self.expand(1 << cur)
+        opp_bit = 1 << opp
+        if not steps & opp_bit: return steps
+        steps &= ~opp_bit
+
+        # Face to face: jump straight over, or sideways if a wall/edge is behind
+        jump = 2 * opp - cur
+        if 0 <= jump < NUM_CELLS and self.is_open(opp, jump):
+            return steps | (1 << jump)
+        return steps | (self.expand(opp_bit) & ~(1 << cur))
+
+    # --- SEARCH ---
+    def distance(self, start, goal_row):
+        """Shortest number of steps from cell start to goal_row, or UNREACHABLE."""
+        goal = ROW_MASKS[goal_row]
+        frontier = seen = 1 << start
+        dist = 0
+        while frontier:
+            if frontier & goal: return dist
+            frontier = self.expand(frontier) & ~seen
+            seen |= frontier
+            dist += 1
+        return UNREACHABLE
+
+    def has_path(self, start, goal_row):
+        return self.distance(start, goal_row) != UNREACHABLE
+
+    def shortest_path(self, start, goal_row):
+        """One shortest path from start to goal_row as a list of cell indices."""
+        goal = ROW_MASKS[goal_row]
+        layers = [1 << start]
+        seen = layers[0]
+        while not layers[-1] & goal:
+            frontier = self.expand(layers[-1]) & ~seen
+            if not frontier: return []
+            seen |= frontier
+            layers.append(frontier)
+
+        # Walk back from the first goal cell, one layer at a time
+        cell = next(iter_bits(layers[-1] & goal))
+        path = [cell]
+        for layer in reversed(layers[:-1]):
+            cell = next(iter_bits(self.expand(1 << cell) & layer))
+            path.append(cell)
+        path.reverse()
+        return path
+
+
+class BoardGraphView(Mapping):
+    """Read-only adjacency view of a BitBoard keyed by (r, c) tuples.
+
+    Keeps ``game.board_graph[(r, c)]`` working for code written against the
+    old defaultdict-of-sets representation.
+    """
+
+    def __init__(self, board):
+        self._board = board
+
+    def __getitem__(self, pos):
+        r, c = pos
+        if not (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE): return set()
+        return {cell_coords(n) for n in self._board.neighbors(cell_index(r, c))}
+
+    def __iter__(self):
+        return (cell_coords(i) for i in range(NUM_CELLS))
+
+    def __len__(self):
+        return NUM_CELLS
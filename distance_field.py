@@ -0,0 +1,151 @@
+"""Incrementally maintained goal-distance maps.
+
+A DistanceField keeps, for one goal row on a live BitBoard, the BFS layers
+grown from that row: ``layers[d]`` is the mask of cells exactly ``d`` steps
+away and ``reached[d]`` the mask of cells at most ``d`` steps away. A lookup
+is a binary search over ``reached``, so it costs a handful of big-int tests.
+
+Layers are grown lazily, only as far as a lookup needs. When a wall is placed
+or removed, the layers past the first edge it touches are dropped and regrown
+on demand; regrowth splices the old layers back in as soon as the wave matches
+them again. Every change is logged so ``undo()`` restores exactly the layers
+it replaced.
+"""
+from bitboard import BOARD_SIZE, ROW_MASKS, UNREACHABLE, WALL_GRID, cell_index, iter_bits
+
+
+class DistanceField:
+    def __init__(self, board, goal_row):
+        self.board = board
+        self.goal_row = goal_row
+        self.layers = []        # layers[d]: cells exactly d steps from the goal row
+        self.reached = []       # reached[d]: cells at most d steps from the goal row
+        self.complete = False   # True once the flood fill has run out of cells
+        self._log = []          # One undo record per wall change
+        self.walls = (0, 0)     # (h_walls, v_walls) at the last rebuild()/follow()
+        self.rebuild()
+
+    def __getitem__(self, cell):
+        """Steps from cell to the goal row, or UNREACHABLE."""
+        bit = 1 << cell
+        reached = self.reached
+        if not reached[-1] & bit:
+            if self.complete: return UNREACHABLE
+            self._grow(bit)
+            if not reached[-1] & bit: return UNREACHABLE
+        lo, hi = 0, len(reached) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if reached[mid] & bit: hi = mid
+            else: lo = mid + 1
+        return lo
+
+    def rebuild(self):
+        """Starts over from the goal row. Clears the undo log."""
+        goal = ROW_MASKS[self.goal_row]
+        self.layers = [goal]
+        self.reached = [goal]
+        self.complete = False
+        self._log.clear()
+        self.walls = (self.board.h_walls, self.board.v_walls)
+
+    def follow(self, board):
+        """Moves the layers onto board (possibly another BitBoard) and its walls.
+
+        Only layers a wall added or removed since the last rebuild()/follow()
+        can reach are dropped, so a field kept from the previous move's
+        search stays mostly grown. Clears the undo log.
+        """
+        old_h, old_v = self.walls
+        self.board = board
+        for changed, orientation in ((board.h_walls ^ old_h, 'H'), (board.v_walls ^ old_v, 'V')):
+            for s in iter_bits(changed):
+                self._invalidate(*divmod(s, WALL_GRID), orientation)
+        self._log.clear()  # Several changes at once: never splice old layers back
+        self.walls = (board.h_walls, board.v_walls)
+
+    def wall_placed(self, r, c, orientation):
+        """Call after the board gained a wall (distances only grow)."""
+        self._invalidate(r, c, orientation)
+
+    def wall_removed(self, r, c, orientation):
+        """Call after the board lost a wall (distances only shrink)."""
+        self._invalidate(r, c, orientation)
+
+    def undo(self):
+        """Reverts the most recent wall_placed/wall_removed in O(changed layers)."""
+        record = self._log.pop()
+        if record is None: return
+        start, old_layers, old_reached, old_complete, _ = record
+        del self.layers[start:], self.reached[start:]
+        self.layers.extend(old_layers)
+        self.reached.extend(old_reached)
+        self.complete = old_complete
+
+    def _layer_of(self, bits, every=False):
+        """First layer whose reached mask holds any (or every) of bits."""
+        reached = self.reached
+        lo, hi = 0, len(reached) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            hit = reached[mid] & bits
+            if (hit == bits) if every else hit: hi = mid
+            else: lo = mid + 1
+        return lo
+
+    def _invalidate(self, r, c, orientation):
+        # 1. Either orientation touches the same 2x2 block of cells. Layers up
+        # to the nearest of them cannot change, and once the wave has passed
+        # all of them an identical wave stays identical
+        i = cell_index(r, c)
+        block = (1 << i) | (1 << (i + 1)) | (1 << (i + BOARD_SIZE)) | (1 << (i + BOARD_SIZE + 1))
+        grown = self.reached[-1] & block
+        if grown == block:
+            first = self._layer_of(block)
+            last = self._layer_of(block, every=True)
+            if first == last:
+                self._log.append(None)  # Edges inside one layer never steer the BFS
+                return
+        elif grown:
+            first, last = self._layer_of(block), UNREACHABLE
+        elif self.complete:
+            self._log.append(None)  # Cut off from the goal either way
+            return
+        else:
+            first, last = len(self.layers) - 1, UNREACHABLE
+
+        # 2. Drop everything past that point; lookups regrow it
+        start = first + 1
+        self._log.append((start, self.layers[start:], self.reached[start:], self.complete, last))
+        del self.layers[start:], self.reached[start:]
+        self.complete = False
+
+    def _grow(self, bit):
+        """Extends the layers until bit is reached or the flood fill runs out."""
+        expand = self.board.expand
+        layers, reached = self.layers, self.reached
+        record = self._log[-1] if self._log else None
+        frontier, seen = layers[-1], reached[-1]
+        d = len(layers) - 1
+        while not seen & bit:
+            frontier = expand(frontier) & ~seen
+            if not frontier:
+                self.complete = True
+                return
+            seen |= frontier
+            d += 1
+            layers.append(frontier)
+            reached.append(seen)
+
+            # Rejoined the wave from before the last change: reuse its layers
+            if record is not None:
+                start, old_layers, old_reached, old_complete, last = record
+                i = d - start
+                if d >= last and i < len(old_layers) and frontier == old_layers[i] and seen == old_reached[i]:
+                    layers.extend(old_layers[i + 1:])
+                    reached.extend(old_reached[i + 1:])
+                    self.complete = old_complete
+                    if reached[-1] & bit or old_complete: return
+                    frontier, seen = layers[-1], reached[-1]
+                    d = len(layers) - 1
+                    record = None
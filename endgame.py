@@ -0,0 +1,144 @@
+"""Exact solver for the pawn race once both players are out of walls.
+
+With no walls left to place, a position is just the two pawn cells and the
+side to move: at most 2 x 81 x 81 states on a fixed board. A retrograde pass
+over that graph (jumps included, via BitBoard.pawn_targets) labels every
+state as a win, loss or draw for the side to move, with the number of plies
+to the end, so the best move is read straight off the table.
+
+Values use the AI's scale, from the side to move's point of view:
+``WIN - plies`` for a win, ``-(WIN - plies)`` for a loss and 0 for a draw
+(both pawns can shuffle forever).
+"""
+import threading
+from array import array
+
+from bitboard import NUM_CELLS, ROW_MASKS, cell_coords, cell_index, iter_bits
+
+WIN = 10000
+CACHE_SIZE = 16  # Solved wall layouts kept in memory
+SOLVE_MS = 150   # Rough worst case of solve() for one layout, for callers on a time budget
+_STATES = 2 * NUM_CELLS * NUM_CELLS
+
+
+def state_index(turn, p1, p2):
+    """Table index of (side to move, player 1 cell, player 2 cell)."""
+    return ((turn - 1) * NUM_CELLS + p1) * NUM_CELLS + p2
+
+
+def _successors(board, turn, p1, p2):
+    if turn == 1:
+        return [state_index(2, t, p2) for t in iter_bits(board.pawn_targets(p1, p2))]
+    return [state_index(1, p1, t) for t in iter_bits(board.pawn_targets(p2, p1))]
+
+
+def solve(board):
+    """Value table (array of ints, indexed by state_index) for a wall layout."""
+    values = array('i', bytes(4 * _STATES))
+    solved = bytearray(_STATES)
+    remaining = array('i', bytes(4 * _STATES))
+    predecessors = [[] for _ in range(_STATES)]
+    goal1, goal2 = ROW_MASKS[8], ROW_MASKS[0]
+
+    # 1. Terminal states (the side to move has already lost) and the move graph
+    frontier = []
+    for turn in (1, 2):
+        for p1 in range(NUM_CELLS):
+            for p2 in range(NUM_CELLS):
+                if p1 == p2: continue
+                s = state_index(turn, p1, p2)
+                won1, won2 = goal1 >> p1 & 1, goal2 >> p2 & 1
+                if won1 or won2:
+                    if (won1 and turn == 2) or (won2 and turn == 1):
+                        values[s], solved[s] = -WIN, 1
+                        frontier.append(s)
+                    continue
+                children = _successors(board, turn, p1, p2)
+                remaining[s] = len(children)
+                for child in children:
+                    predecessors[child].append(s)
+
+    # 2. Retrograde BFS: one ply further from the end per layer. A state that
+    # can reach a loss wins (fastest first); one whose every move reaches a
+    # win loses (slowest last, since wins resolve in increasing order)
+    plies = 0
+    while frontier:
+        plies += 1
+        next_frontier = []
+        for s in frontier:
+            lost = values[s] < 0
+            for p in predecessors[s]:
+                if solved[p]: continue
+                if lost:
+                    values[p], solved[p] = WIN - plies, 1
+                    next_frontier.append(p)
+                else:
+                    remaining[p] -= 1
+                    if remaining[p] == 0:
+                        values[p], solved[p] = -(WIN - plies), 1
+                        next_frontier.append(p)
+        frontier = next_frontier
+    return values
+
+
+class EndgameSolver:
+    def __init__(self):
+        self._tables = {}  # (h_walls, v_walls) -> value table
+        self._pending = set()  # Layouts being solved in the background
+
+    @staticmethod
+    def applies(game):
+        return game.walls_left[1] == 0 and game.walls_left[2] == 0 and not game.winner
+
+    def solved(self, board):
+        """True if board's table is already cached (value() then costs one lookup)."""
+        return (board.h_walls, board.v_walls) in self._tables
+
+    def solve_in_background(self, board):
+        """Starts solving board's layout on a daemon thread (once); solved() turns true when done."""
+        key = (board.h_walls, board.v_walls)
+        if key in self._tables or key in self._pending: return
+        self._pending.add(key)
+        board = board.copy()  # The caller's board keeps changing under its search
+
+        def run():
+            values = solve(board)
+            if len(self._tables) >= CACHE_SIZE: self._tables.clear()
+            self._tables[key] = values
+            self._pending.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def table(self, board):
+        key = (board.h_walls, board.v_walls)
+        values = self._tables.get(key)
+        if values is None:
+            if len(self._tables) >= CACHE_SIZE: self._tables.clear()
+            values = self._tables[key] = solve(board)
+        return values
+
+    def value(self, game, player=None):
+        """Exact value of the position for player (default: the side to move)."""
+        turn = game.current_turn
+        p1, p2 = (cell_index(*game.player_positions[p]) for p in (1, 2))
+        value = self.table(game.board)[state_index(turn, p1, p2)]
+        return value if (player or turn) == turn else -value
+
+    def best_move(self, game):
+        """(move tuple, value) of the optimal move for the side to move.
+
+        Wins as fast as possible, loses as slowly as possible.
+        """
+        values = self.table(game.board)
+        turn = game.current_turn
+        opponent = 2 if turn == 1 else 1
+        cur = cell_index(*game.player_positions[turn])
+        opp = cell_index(*game.player_positions[opponent])
+        best, best_value = None, None
+        for target in iter_bits(game.board.pawn_targets(cur, opp)):
+            p1, p2 = (target, opp) if turn == 1 else (opp, target)
+            value = -values[state_index(opponent, p1, p2)]
+            if best_value is None or value > best_value:
+                best, best_value = target, value
+        if best is None: return None, 0
+        return ('move', *cell_coords(best), *game.player_positions[turn]), best_value
@@ -0,0 +1,243 @@
+"""Append-only archive of finished games, readable through mmap.
+
+An archive is two files. ``<path>`` holds the records, after the usual
+save_format header (kind b'A'):
+
+    uint32  record size in bytes (this prefix included)
+    uint16  ply count, uint16 metadata size
+    24      start position (save_format.POSITION)
+    plies x uint16   move records (QuoridorGame history encoding)
+    plies x float32  think time of each move in ms (0 when unknown)
+    UTF-8 JSON metadata (AI settings, result, ...)
+
+``<path>.idx`` is the offset index: one uint64 per game pointing at its
+record, so game #n costs one lookup. Records are written before their index
+entry; a writer that finds records the index lacks (a crash between the two)
+re-indexes them, and drops a partly written last record.
+
+Readers map both files once: GameArchive(path)[n] decodes one game and
+positions() streams the snapshot() of every ply of every game without
+loading the file. Example:
+
+    with GameArchiveWriter('games.qga') as archive:
+        archive.append(game, {'a': 'Hard', 'winner': 1}, think_ms)
+    with GameArchive('games.qga') as archive:
+        for snapshot in archive.positions(): ...
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import save_format
+from save_format import HEADER, POSITION
+
+KIND_ARCHIVE = b'A'
+RECORD = struct.Struct('<IHH')
+OFFSET = struct.Struct('<Q')
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def _to_bytes(values, typecode):
+    values = array(typecode, values)
+    if sys.byteorder == 'big': values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(data, typecode):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big': values.byteswap()
+    return values
+
+
+def encode_record(start, moves, think_ms=None, meta=None):
+    """Bytes of one archive record."""
+    meta_bytes = json.dumps(meta or {}, separators=(',', ':')).encode()
+    think_ms = think_ms if think_ms is not None else [0.0] * len(moves)
+    if len(think_ms) != len(moves): raise ValueError("Need one think time per move")
+    body = b''.join((save_format.pack_position(start), _to_bytes(moves, 'H'),
+                     _to_bytes(think_ms, 'f'), meta_bytes))
+    return RECORD.pack(RECORD.size + len(body), len(moves), len(meta_bytes)) + body
+
+
+def _scan(data, offset):
+    """Offsets of the complete records from offset on, and where they end."""
+    offsets = []
+    while offset + RECORD.size <= len(data):
+        size, plies, meta_size = RECORD.unpack_from(data, offset)
+        if size != RECORD.size + POSITION.size + 6 * plies + meta_size or offset + size > len(data): break
+        offsets.append(offset)
+        offset += size
+    return offsets, offset
+
+
+class GameArchiveWriter:
+    """Appends games to an archive, creating it if needed."""
+    def __init__(self, path):
+        self.path = path
+        self._data = open(path, 'a+b')
+        self._index = open(index_path(path), 'a+b')
+        if self._data.tell() == 0:
+            self._data.write(save_format.pack_header(KIND_ARCHIVE))
+            self._data.flush()
+            self._index.truncate(0)
+        self._recover()
+
+    def _recover(self):
+        """Indexes records the index is missing and drops a torn last record.
+
+        Only the header, the last index entry and the records after it are
+        read, so opening a writer costs the same for any archive size.
+        """
+        self._data.seek(0)
+        save_format.check_header(self._data.read(HEADER.size), KIND_ARCHIVE, self.path)
+        count = os.fstat(self._index.fileno()).st_size // OFFSET.size
+        resume = HEADER.size
+        if count:
+            self._index.seek((count - 1) * OFFSET.size)
+            resume = OFFSET.unpack(self._index.read(OFFSET.size))[0]
+        with mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            missing, end = _scan(data, resume)
+            size = len(data)
+        if count: missing = missing[1:]  # The first one found is the last indexed record
+        self._index.truncate(count * OFFSET.size)
+        if end < size: self._data.truncate(end)
+        self._data.seek(0, os.SEEK_END)
+        self._index.seek(0, os.SEEK_END)
+        for offset in missing:
+            self._index.write(OFFSET.pack(offset))
+        self._index.flush()
+        self.count = count + len(missing)
+
+    def append(self, game, meta=None, think_ms=None):
+        """Archives the plies played in game (a QuoridorGame). Returns the game number."""
+        return self.append_moves(game.checkpoints[0], game.history, think_ms, meta)
+
+    def append_moves(self, start, moves, think_ms=None, meta=None):
+        """Archives a start snapshot() and its move records. Returns the game number."""
+        record = encode_record(start, moves, think_ms, meta)
+        offset = self._data.tell()
+        self._data.write(record)
+        self._data.flush()
+        self._index.write(OFFSET.pack(offset))
+        self._index.flush()
+        self.count += 1
+        return self.count - 1
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameArchive:
+    """Read-only view of an archive as it was when opened.
+
+    archive[n] is a dict with 'start' (snapshot), 'moves' (array of move
+    records), 'think_ms' (array of floats) and 'meta'.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            save_format.check_header(self._data, KIND_ARCHIVE, path)
+            self._index = self._load_index()
+        except (OSError, ValueError):
+            self._data.close()
+            raise
+        self.count = len(self._index) // OFFSET.size
+
+    def _load_index(self):
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    index = b''
+        except FileNotFoundError:
+            index = b''
+        # Records after the last indexed one (e.g. the index was lost) are found by a scan
+        count = len(index) // OFFSET.size
+        resume = OFFSET.unpack_from(index, (count - 1) * OFFSET.size)[0] if count else HEADER.size
+        missing, _ = _scan(self._data, resume)
+        if count: missing = missing[1:]
+        if not missing: return index
+        offsets = bytearray(index[:count * OFFSET.size])
+        for offset in missing:
+            offsets += OFFSET.pack(offset)
+        if isinstance(index, mmap.mmap): index.close()
+        return bytes(offsets)
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, n):
+        if n < 0: n += self.count
+        if not 0 <= n < self.count: raise IndexError("Game archive index out of range")
+        return OFFSET.unpack_from(self._index, n * OFFSET.size)[0]
+
+    def __getitem__(self, n):
+        data, offset = self._data, self.offset(n)
+        _, plies, meta_size = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        start = save_format.unpack_position(data, offset)
+        offset += POSITION.size
+        moves = _from_bytes(data[offset:offset + 2 * plies], 'H')
+        offset += 2 * plies
+        think_ms = _from_bytes(data[offset:offset + 4 * plies], 'f')
+        offset += 4 * plies
+        meta = json.loads(data[offset:offset + meta_size]) if meta_size else {}
+        return {'start': start, 'moves': moves, 'think_ms': think_ms, 'meta': meta}
+
+    def __iter__(self):
+        for n in range(self.count):
+            yield self[n]
+
+    def meta(self, n):
+        """Metadata of game n alone (skips the moves)."""
+        offset = self.offset(n)
+        size, _, meta_size = RECORD.unpack_from(self._data, offset)
+        end = offset + size
+        return json.loads(self._data[end - meta_size:end]) if meta_size else {}
+
+    def positions(self, games=None):
+        """Yields (game number, ply, snapshot()) for every ply of the given games (default all).
+
+        Moves are applied as deltas on one scratch game, so this streams at
+        the cost of a move per position.
+        """
+        from game_logic import QuoridorGame
+
+        scratch = QuoridorGame()
+        for n in (range(self.count) if games is None else games):
+            record = self[n]
+            scratch.restore_snapshot(record['start'])
+            yield n, 0, scratch.snapshot()
+            for ply, move in enumerate(record['moves'], 1):
+                scratch._apply_record(move)
+                yield n, ply, scratch.snapshot()
+
+    def close(self):
+        if isinstance(self._index, mmap.mmap): self._index.close()
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,12 +1,18 @@
-import collections
-import copy
-import pickle  # For saving/loading
 import random
+from array import array
+
+import save_format
+from bitboard import (WALL_MOVE_BASE, BitBoard, BoardGraphView, cell_coords, cell_index, iter_bits,
+                      slot_index, wall_coords, walls_cutting)
+
+LEGAL_CACHE_SIZE = 4096  # Positions whose legal_moves() are remembered
 
 class QuoridorGame:
-    def __init__(self):
+    def __init__(self, checkpoint_every=0):
         self.rows = 9
         self.cols = 9
+        self.checkpoint_every = checkpoint_every # 0 = no snapshot checkpoints
+        self.stats = None # A SearchStats counting path searches, set by the AI while it searches
         self.reset_game()
 
     def reset_game(self):
@@ -14,113 +20,190 @@ class QuoridorGame:
         self.walls_left = {1: 10, 2: 10}
         self.current_turn = 1
         self.winner = None
-        self.board_graph = self._initialize_graph()
-        self.placed_walls = set()
+        self.board = BitBoard()
         
         # Bonus: History for Undo/Redo
-        self.history = []     # Stack of previous states
-        self.redo_stack = []  # Stack of undone states
-
-    def _initialize_graph(self):
-        graph = collections.defaultdict(set)
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if r > 0: graph[(r, c)].add((r - 1, c))
-                if r < self.rows - 1: graph[(r, c)].add((r + 1, c))
-                if c > 0: graph[(r, c)].add((r, c - 1))
-                if c < self.cols - 1: graph[(r, c)].add((r, c + 1))
-        return graph
-
-    def save_state(self):
-        """Pushes current state to history stack before a move."""
-        state = {
-            'player_positions': copy.deepcopy(self.player_positions),
-            'walls_left': copy.deepcopy(self.walls_left),
-            'current_turn': self.current_turn,
-            'board_graph': copy.deepcopy(self.board_graph),
-            'placed_walls': copy.deepcopy(self.placed_walls),
-            'winner': self.winner
-        }
-        self.history.append(state)
-        self.redo_stack.clear() # Clear redo on new move
-
-    def restore_state(self, state):
-        """Restores game to a specific state dict."""
-        self.player_positions = state['player_positions']
-        self.walls_left = state['walls_left']
-        self.current_turn = state['current_turn']
-        self.board_graph = state['board_graph']
-        self.placed_walls = state['placed_walls']
-        self.winner = state['winner']
+        self._clear_history()
+
+    @property
+    def board_graph(self):
+        """Adjacency view ((r, c) -> set of neighbours) over the bitboard."""
+        return BoardGraphView(self.board)
+
+    @property
+    def placed_walls(self):
+        return set(self.board.walls())
+
+    # --- History ---
+    # Each ply is one 16-bit move record, so undo/redo are O(1) deltas:
+    #   pawn: bit 14 = player - 1, bits 7-13 = from cell, bits 0-6 = to cell
+    #   wall: bit 15 set, bit 14 = player - 1, bit 6 = vertical, bits 0-5 = slot
+
+    def _clear_history(self):
+        self.history = array('H')     # Move records of the plies played
+        self.redo_stack = array('H')  # Move records of the plies undone
+        self.checkpoints = {0: self.snapshot()} # ply -> snapshot(), every checkpoint_every plies
+        self._legal_cache = {}
+
+    def _encode_pawn_move(self, player, frm, to):
+        return (player - 1) << 14 | cell_index(*frm) << 7 | cell_index(*to)
+
+    def _encode_wall(self, player, r, c, orientation):
+        return 0x8000 | (player - 1) << 14 | (orientation == 'V') << 6 | slot_index(r, c)
+
+    def save_state(self, record):
+        """Pushes the move record of the ply about to be played."""
+        self.history.append(record)
+        if self.redo_stack:
+            self.redo_stack = array('H') # Clear redo on new move
+            ply = len(self.history)
+            for stale in [p for p in self.checkpoints if p >= ply]:
+                del self.checkpoints[stale]
+
+    def _apply_record(self, record):
+        player = (record >> 14 & 1) + 1
+        if record & 0x8000:
+            r, c = divmod(record & 63, 8)
+            self.board.place_wall(r, c, 'V' if record & 64 else 'H')
+            self.walls_left[player] -= 1
+        else:
+            self.player_positions[player] = cell_coords(record & 127)
+            self.check_win_condition()
+        self.switch_turn()
+
+    def _revert_record(self, record):
+        player = (record >> 14 & 1) + 1
+        if record & 0x8000:
+            r, c = divmod(record & 63, 8)
+            self.board.remove_wall(r, c, 'V' if record & 64 else 'H')
+            self.walls_left[player] += 1
+        else:
+            self.player_positions[player] = cell_coords(record >> 7 & 127)
+            self.winner = None # Nobody had won before this ply, or it couldn't be played
+        self.current_turn = player
+
+    def _checkpoint(self):
+        ply = len(self.history)
+        if self.checkpoint_every and ply % self.checkpoint_every == 0:
+            self.checkpoints[ply] = self.snapshot()
 
     def undo(self):
         if not self.history: return False
-        
-        # Save current state to redo stack first
-        current_state = {
-            'player_positions': copy.deepcopy(self.player_positions),
-            'walls_left': copy.deepcopy(self.walls_left),
-            'current_turn': self.current_turn,
-            'board_graph': copy.deepcopy(self.board_graph),
-            'placed_walls': copy.deepcopy(self.placed_walls),
-            'winner': self.winner
-        }
-        self.redo_stack.append(current_state)
-        
-        # Pop previous state
-        prev_state = self.history.pop()
-        self.restore_state(prev_state)
+        record = self.history.pop()
+        self._revert_record(record)
+        self.redo_stack.append(record)
         return True
 
     def redo(self):
         if not self.redo_stack: return False
-        
-        # Save current to history
-        current_state = {
-             'player_positions': copy.deepcopy(self.player_positions),
-             'walls_left': copy.deepcopy(self.walls_left),
-             'current_turn': self.current_turn,
-             'board_graph': copy.deepcopy(self.board_graph),
-             'placed_walls': copy.deepcopy(self.placed_walls),
-             'winner': self.winner
-        }
-        self.history.append(current_state)
-        
-        # Pop future state
-        next_state = self.redo_stack.pop()
-        self.restore_state(next_state)
+        record = self.redo_stack.pop()
+        self._apply_record(record)
+        self.history.append(record)
         return True
 
-    def save_game_to_file(self, filename="quoridor_save.pkl"):
-        """Bonus: Save game to file"""
-        with open(filename, 'wb') as f:
-            pickle.dump(self.__dict__, f)
+    def position_at(self, ply):
+        """snapshot() of the position after ply plies of the current history.
 
-    def load_game_from_file(self, filename="quoridor_save.pkl"):
-        """Bonus: Load game from file"""
-        try:
-            with open(filename, 'rb') as f:
-                data = pickle.load(f)
-                self.__dict__.update(data)
-            return True
-        except FileNotFoundError:
-            return False
+        Replays forward from the nearest checkpoint, so with checkpoints on
+        this never replays more than checkpoint_every plies.
+        """
+        records = self.history.tolist() + self.redo_stack[::-1].tolist()
+        if not 0 <= ply <= len(records): raise IndexError(f"No ply {ply} in history")
+        base = max(p for p in self.checkpoints if p <= ply)
+        scratch = QuoridorGame()
+        scratch.restore_snapshot(self.checkpoints[base])
+        for record in records[base:ply]:
+            scratch._apply_record(record)
+        return scratch.snapshot()
+
+    def snapshot(self):
+        """Compact, picklable copy of the position (no history)."""
+        return (self.player_positions[1], self.player_positions[2],
+                self.walls_left[1], self.walls_left[2],
+                self.current_turn, self.winner,
+                self.board.h_walls, self.board.v_walls)
+
+    def restore_snapshot(self, snapshot):
+        """Loads a position made by snapshot(). Clears undo/redo history."""
+        p1, p2, w1, w2, turn, winner, h_walls, v_walls = snapshot
+        self.player_positions = {1: p1, 2: p2}
+        self.walls_left = {1: w1, 2: w2}
+        self.current_turn = turn
+        self.winner = winner
+        self.board = BitBoard.from_walls(h_walls, v_walls)
+        self._clear_history()
+
+    # --- Move generation ---
+    # Moves are packed ints: a cell index (0..80) for a pawn move,
+    # WALL_MOVE_BASE + wall_id for a wall (see bitboard.py)
+
+    def legal_moves(self, player=None, pruned=False):
+        """Tuple of packed legal moves for player (default: the side to move).
+
+        pruned=True keeps every pawn move but only the walls that cut the first
+        five steps of the opponent's shortest path, in path order: the set the
+        AI searches. Results are cached by position, so they stay valid across
+        moves, undo and redo (and positions a search mutates in place).
+        """
+        if self.winner: return ()
+        player = player or self.current_turn
+        if self.walls_left[player] <= 0: return self._generate_moves(player, pruned) # Pawn moves only: cheaper than a lookup
+        key = (self.snapshot(), player, pruned)
+        moves = self._legal_cache.get(key)
+        if moves is None:
+            if len(self._legal_cache) >= LEGAL_CACHE_SIZE: self._legal_cache.clear()
+            moves = self._legal_cache[key] = self._generate_moves(player, pruned)
+        return moves
+
+    def clear_legal_cache(self):
+        self._legal_cache.clear()
+
+    def _generate_moves(self, player, pruned):
+        board = self.board
+        opponent = 2 if player == 1 else 1
+        cur = cell_index(*self.player_positions[player])
+        opp = cell_index(*self.player_positions[opponent])
+
+        # 1. Pawn moves (steps, straight and diagonal jumps in one mask)
+        moves = list(iter_bits(board.pawn_targets(cur, opp)))
+        if self.walls_left[player] <= 0: return tuple(moves)
+
+        # 2. Walls: every free slot, or just those across the opponent's route
+        if pruned:
+            if self.stats: self.stats.bfs_calls += 1
+            path = board.shortest_path(opp, 8 if opponent == 1 else 0)[:6]
+            candidates = []
+            for a, b in zip(path, path[1:]):
+                candidates.extend(w for w in walls_cutting(a, b) if w not in candidates)
+        else:
+            candidates = iter_bits(board.available)
+        for wall in candidates:
+            if board.available >> wall & 1 and self._keeps_paths(*wall_coords(wall)):
+                moves.append(WALL_MOVE_BASE + wall)
+        return tuple(moves)
+
+    def _keeps_paths(self, r, c, orientation):
+        """True if both players can still reach their goal once this (free) wall is added."""
+        # Tentatively cut the edges to make sure nobody gets sealed in
+        # (only needed when the wall could close a loop with other walls)
+        if self.board.cannot_disconnect(r, c, orientation): return True
+        if self.stats: self.stats.wall_checks += 1
+        self.board.place_wall(r, c, orientation)
+        legal = self.has_path(1) and self.has_path(2)
+        self.board.remove_wall(r, c, orientation)
+        return legal
+
+    def decode_move(self, move, player=None):
+        """Packed move -> ('move', r, c, from_r, from_c) or ('wall', r, c, orientation)."""
+        if move >= WALL_MOVE_BASE:
+            return ('wall', *wall_coords(move - WALL_MOVE_BASE))
+        r, c = cell_coords(move)
+        return ('move', r, c, *self.player_positions[player or self.current_turn])
 
-    
     def is_valid_pawn_move(self, current_pos, target_pos, opponent_pos):
-        # ... (Same as before) ...
-        neighbors = self.board_graph[current_pos]
-        if target_pos in neighbors:
-            if target_pos == opponent_pos: return False 
-            return True
-        if opponent_pos in neighbors:
-            dr = opponent_pos[0] - current_pos[0]
-            dc = opponent_pos[1] - current_pos[1]
-            jump_dest = (opponent_pos[0] + dr, opponent_pos[1] + dc)
-            if jump_dest in self.board_graph[opponent_pos] and target_pos == jump_dest: return True
-            if jump_dest not in self.board_graph[opponent_pos]:
-                if target_pos in self.board_graph[opponent_pos] and target_pos != current_pos: return True
-        return False
+        if not (0 <= target_pos[0] < self.rows and 0 <= target_pos[1] < self.cols): return False
+        targets = self.board.pawn_targets(cell_index(*current_pos), cell_index(*opponent_pos))
+        return bool(targets >> cell_index(*target_pos) & 1)
 
     def move_pawn(self, player, r, c):
         if self.winner or player != self.current_turn: return False
@@ -129,10 +212,11 @@ class QuoridorGame:
         opponent_pos = self.player_positions[opponent]
 
         if self.is_valid_pawn_move(current_pos, (r, c), opponent_pos):
-            self.save_state() # <--- SAVE BEFORE MODIFYING
+            self.save_state(self._encode_pawn_move(player, current_pos, (r, c))) # <--- SAVE BEFORE MODIFYING
             self.player_positions[player] = (r, c)
             self.check_win_condition()
             self.switch_turn()
+            self._checkpoint()
             return True
         return False
 
@@ -140,53 +224,21 @@ class QuoridorGame:
         if self.winner or player != self.current_turn: return False
         if self.walls_left[player] <= 0: return False
         if not (0 <= r < 8 and 0 <= c < 8): return False
-        if (r, c, 'H') in self.placed_walls or (r, c, 'V') in self.placed_walls: return False
-        
-        if orientation == 'H':
-            if (r, c-1, 'H') in self.placed_walls or (r, c+1, 'H') in self.placed_walls: return False
-        else:
-            if (r-1, c, 'V') in self.placed_walls or (r+1, c, 'V') in self.placed_walls: return False
+        if self.board.wall_conflicts(r, c, orientation): return False
+        if not self._keeps_paths(r, c, orientation): return False
 
-        edges_to_cut = []
-        if orientation == 'H':
-            p1, p2, p3, p4 = (r, c), (r+1, c), (r, c+1), (r+1, c+1)
-            edges_to_cut = [(p1, p2), (p3, p4)]
-        else:
-            p1, p2, p3, p4 = (r, c), (r, c+1), (r+1, c), (r+1, c+1)
-            edges_to_cut = [(p1, p2), (p3, p4)]
-
-        temp_removed = []
-        for u, v in edges_to_cut:
-            if v in self.board_graph[u]:
-                self.board_graph[u].remove(v)
-                self.board_graph[v].remove(u)
-                temp_removed.append((u, v))
-
-        if self.has_path(1) and self.has_path(2):
-            self.save_state() # <--- SAVE BEFORE FINALIZING
-            self.placed_walls.add((r, c, orientation))
-            self.walls_left[player] -= 1
-            self.switch_turn()
-            return True
-        else:
-            for u, v in temp_removed:
-                self.board_graph[u].add(v)
-                self.board_graph[v].add(u)
-            return False
+        self.save_state(self._encode_wall(player, r, c, orientation)) # <--- SAVE BEFORE FINALIZING
+        self.board.place_wall(r, c, orientation)
+        self.walls_left[player] -= 1
+        self.switch_turn()
+        self._checkpoint()
+        return True
 
     def has_path(self, player_id):
+        if self.stats: self.stats.bfs_calls += 1
         start_node = self.player_positions[player_id]
         goal_row = 8 if player_id == 1 else 0
-        queue = collections.deque([start_node])
-        visited = {start_node}
-        while queue:
-            curr_r, curr_c = queue.popleft()
-            if curr_r == goal_row: return True
-            for neighbor in self.board_graph[(curr_r, curr_c)]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-        return False
+        return self.board.has_path(cell_index(*start_node), goal_row)
 
     def switch_turn(self):
         self.current_turn = 2 if self.current_turn == 1 else 1
@@ -195,73 +247,25 @@ class QuoridorGame:
         if self.player_positions[1][0] == 8: self.winner = 1
         elif self.player_positions[2][0] == 0: self.winner = 2
     
-    # --- ADD THIS HELPER METHOD TO game_logic.py ---
-    def _remove_edges_for_wall(self, r, c, orientation):
-        """Helper to cut graph edges without rule checks (for loading/internal use)."""
-        edges_to_cut = []
-        if orientation == 'H':
-            p1, p2, p3, p4 = (r, c), (r+1, c), (r, c+1), (r+1, c+1)
-            edges_to_cut = [(p1, p2), (p3, p4)]
-        else:
-            p1, p2, p3, p4 = (r, c), (r, c+1), (r+1, c), (r+1, c+1)
-            edges_to_cut = [(p1, p2), (p3, p4)]
-
-        for u, v in edges_to_cut:
-            if v in self.board_graph[u]:
-                self.board_graph[u].remove(v)
-            if u in self.board_graph[v]:
-                self.board_graph[v].remove(u)
-
-
-    def save_game_to_file(self, filename="quoridor_save.pkl"):
-        """Saves only the essential state data."""
+    def save_game_to_file(self, filename="quoridor_save.qsv"):
+        """Saves the start position and every ply (see save_format.py)."""
         try:
-            state_data = {
-                'player_positions': self.player_positions,
-                'walls_left': self.walls_left,
-                'current_turn': self.current_turn,
-                'placed_walls': list(self.placed_walls), # Convert set to list
-                'winner': self.winner,
-                # Note: We do NOT save history or board_graph to keep file small and safe
-            }
-            with open(filename, 'wb') as f:
-                pickle.dump(state_data, f)
+            save_format.save_game(filename, self)
             print(f"Game saved successfully to {filename}")
             return True
-        except Exception as e:
+        except OSError as e:
             print(f"Error saving game: {e}")
             return False
 
-    def load_game_from_file(self, filename="quoridor_save.pkl"):
-        """Loads state and REBUILDS the graph from scratch."""
+    def load_game_from_file(self, filename="quoridor_save.qsv"):
+        """Loads a saved game, replaying its moves; undo/redo pick up where the save left off."""
         try:
-            with open(filename, 'rb') as f:
-                data = pickle.load(f)
-
-            # 1. Reset Board Graph to clean state
-            self.board_graph = self._initialize_graph()
-            
-            # 2. Restore Attributes
-            self.player_positions = data['player_positions']
-            self.walls_left = data['walls_left']
-            self.current_turn = data['current_turn']
-            self.winner = data['winner']
-            
-            # 3. Restore Walls and Re-Cut Edges
-            self.placed_walls = set() # Start clean
-            for r, c, orient in data['placed_walls']:
-                self.placed_walls.add((r, c, orient))
-                self._remove_edges_for_wall(r, c, orient)
-
-            # 4. Clear History (Undo/Redo implies current session only)
-            self.history = []
-            self.redo_stack = []
-            
+            save_format.load_game(filename, self)
             print("Game loaded successfully.")
             return True
         except FileNotFoundError:
             print("Save file not found.")
             return False
-        except Exception as e:
+        except (OSError, ValueError) as e:
             print(f"Error loading game: {e}")
-            return False
\ No newline at end of file
+            return False
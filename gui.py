@@ -1,5 +1,7 @@
 import pygame
 import sys
+from ai_worker import BackgroundSearch
+from bitboard import WALL_MOVE_BASE, cell_index, wall_id
 from game_logic import QuoridorGame
 
 
@@ -34,6 +36,7 @@ P2_SHINE = (180, 220, 255)      # Highlight for 3D effect
 WALL_COLOR = (229, 192, 123)    # Gold/Wood color
 WALL_SHADOW = (20, 20, 20)      # For depth
 GHOST_WALL_COLOR = (152, 195, 121) # Soft Green
+BLOCKED_WALL_COLOR = (224, 108, 117) # Soft Red (ghost of an illegal wall)
 
 # --- ADD THESE TO YOUR COLOR CONSTANTS ---
 BUTTON_COLOR = (70, 80, 100)    # Slate Blue-Grey
@@ -42,6 +45,10 @@ BUTTON_ACTIVE = (60, 120, 180)  # Bright Blue (for selected options)
 BUTTON_SHADOW = (30, 30, 40)    # Dark Shadow
 TEXT_COLOR = (220, 220, 220)    # Off-White
 
+# --- AI ---
+PONDER_REPLIES = 3  # Human replies the Hard AI pre-searches on the human's time
+EXPERT_BUDGET_MS = 1000  # MCTS thinking time per move (it has no depth to stop at)
+
 class QuoridorGUI:
     def __init__(self):
         pygame.init()
@@ -53,6 +60,7 @@ class QuoridorGUI:
         
         self.game = QuoridorGame()
         self.ai = None
+        self.search = None # Background AI search (PvAI only)
         
         # State: 'MENU', 'GAME', 'GAME_OVER'
         self.state = 'MENU'
@@ -65,6 +73,11 @@ class QuoridorGUI:
         self.notification_timer = 0
         self.notification_color = (50, 200, 50) # Default Green
 
+    def cancel_ai(self):
+        """Stops any in-flight AI search (undo, load, menu and quit call this first)."""
+        if self.search:
+            self.search.cancel()
+
     def show_notification(self, text, color=(50, 200, 50)):
         self.notification_text = text
         self.notification_color = color
@@ -143,30 +156,43 @@ class QuoridorGUI:
         if self.mode == 'PvAI':
             self.draw_text("AI Difficulty", self.font, (150, 160, 170), SCREEN_WIDTH//2, 430)
             
-            # Three smaller buttons in a row
-            easy_rect = self.draw_button("Easy", 120, 460, 140, 50, active=(self.difficulty == 'Easy'))
+            # Four smaller buttons in a row
+            easy_rect = self.draw_button("Easy", 85, 460, 125, 50, active=(self.difficulty == 'Easy'))
             if easy_rect.collidepoint(pygame.mouse.get_pos()) and pygame.mouse.get_pressed()[0]:
                 self.difficulty = 'Easy'
                 
-            med_rect = self.draw_button("Medium", 280, 460, 140, 50, active=(self.difficulty == 'Medium'))
+            med_rect = self.draw_button("Medium", 220, 460, 125, 50, active=(self.difficulty == 'Medium'))
             if med_rect.collidepoint(pygame.mouse.get_pos()) and pygame.mouse.get_pressed()[0]:
                 self.difficulty = 'Medium'
 
-            hard_rect = self.draw_button("Hard", 440, 460, 140, 50, active=(self.difficulty == 'Hard'))
+            hard_rect = self.draw_button("Hard", 355, 460, 125, 50, active=(self.difficulty == 'Hard'))
             if hard_rect.collidepoint(pygame.mouse.get_pos()) and pygame.mouse.get_pressed()[0]:
                 self.difficulty = 'Hard'
 
+            # Expert: Monte Carlo tree search (mcts.py)
+            expert_rect = self.draw_button("Expert", 490, 460, 125, 50, active=(self.difficulty == 'Expert'))
+            if expert_rect.collidepoint(pygame.mouse.get_pos()) and pygame.mouse.get_pressed()[0]:
+                self.difficulty = 'Expert'
+
         # 5. Start Game Button (Big Green/Gold button at bottom)
         start_rect = self.draw_button("START GAME", 225, 600, 250, 70)
         
         if start_rect.collidepoint(pygame.mouse.get_pos()) and pygame.mouse.get_pressed()[0]:
+            self.cancel_ai()
             self.game.reset_game()
             if self.mode == 'PvAI':
                 # Re-initialize AI with chosen difficulty
+                # (it searches its own copy of the board on a background thread)
                 from ai_agent import QuoridorAI 
-                self.ai = QuoridorAI(self.game, player_id=2, difficulty=self.difficulty)
+                from opening_book import OpeningBook
+                book = OpeningBook.load_default() if self.difficulty in ('Hard', 'Expert') else None
+                budget = EXPERT_BUDGET_MS if self.difficulty == 'Expert' else None
+                self.ai = QuoridorAI(QuoridorGame(), player_id=2, difficulty=self.difficulty, book=book,
+                                     time_budget_ms=budget, verbose=True)
+                self.search = BackgroundSearch(self.ai, PONDER_REPLIES if self.difficulty == 'Hard' else 0)
             else:
                 self.ai = None
+                self.search = None
             self.state = 'GAME'
             pygame.time.delay(200) # Prevent accidental double clicks
 
@@ -212,22 +238,26 @@ class QuoridorGUI:
 
     def run_game(self):
         # 1. AI Turn Handling
-        # We process this before drawing so the AI moves immediately if ready
+        # The search runs on a background thread; we just start it and pick up
+        # the move on a later frame, so the window keeps rendering meanwhile
         if self.mode == 'PvAI' and self.game.current_turn == 2 and not self.game.winner:
-            # Force a display update so the user sees their own move before the AI thinks
-            pygame.display.flip() 
-            
-            # Small delay for natural feel
-            pygame.time.delay(100) 
-            pygame.event.pump() # Process internal events so window doesn't freeze
-            
-            action = self.ai.get_move()
+            action = None
+            if not self.search.active:
+                self.search.start(self.game)
+            elif self.search.done:
+                action = self.search.take_result()
+                # Ignore a result for a position that is no longer on the board
+                if self.search.position != self.game.snapshot():
+                    action = None
             if action:
                 if action[0] == 'move':
                     self.game.move_pawn(2, action[1], action[2])
                 elif action[0] == 'wall':
                     # AI might suggest invalid wall, so we try; if fails, fallback happens in AI logic
                     self.game.place_wall(2, action[1], action[2], action[3])
+        elif self.mode == 'PvAI' and not self.game.winner:
+            # Human to move: search answers to their likeliest replies meanwhile
+            self.search.ponder(self.game)
         
         # 2. Draw
         self.screen.fill(BG_COLOR) # Use the new Dark Blue-Grey background
@@ -240,11 +270,13 @@ class QuoridorGUI:
         r, c, type_, orient = self.get_smart_coords(mouse_pos)
         
         if not self.game.winner and r is not None:
+            legal = self.game.legal_moves() # Cached per position, so cheap every frame
             if type_ == 'wall' and orient:
-                # Draw the Green Ghost Wall
-                self.draw_ghost_wall(r, c, orient)
+                # Draw the Green Ghost Wall (Red if it can't be placed there)
+                ok = 0 <= r < 8 and 0 <= c < 8 and WALL_MOVE_BASE + wall_id(r, c, orient) in legal
+                self.draw_ghost_wall(r, c, orient, ok)
                 
-            elif type_ == 'cell':
+            elif type_ == 'cell' and cell_index(r, c) in legal:
                 # Highlight cell (Using updated OFFSET_X/Y and CELL_HIGHLIGHT)
                 cx = OFFSET_X + c * TOTAL_CELL_SIZE
                 cy = OFFSET_Y + r * TOTAL_CELL_SIZE
@@ -256,20 +288,28 @@ class QuoridorGUI:
         # 4. Event Handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                self.cancel_ai()
                 pygame.quit(); sys.exit()
                 
             if event.type == pygame.KEYDOWN:
                 # Consolidated Key Checks
                 if event.key == pygame.K_z: 
                     if self.mode == 'PvAI':
+                        thinking = self.search.active
+                        self.cancel_ai()
+                        if thinking and self.game.current_turn == 2:
+                            # AI was still thinking: just take back the Human move
+                            if self.game.undo():
+                                self.show_notification("UNDO", color=(200, 200, 50))
                         # In AI mode, we must undo TWICE to get back to Human turn
                         # (Undo AI move + Undo Player move)
-                        if len(self.game.history) >= 2:
+                        elif len(self.game.history) >= 2:
                             self.game.undo() # Undo AI
                             self.game.undo() # Undo Human
                             self.show_notification("UNDO (2 Steps)", color=(200, 200, 50))
                         else:
                              self.show_notification("CANNOT UNDO", color=(200, 50, 50))
+                        self.ai.sync() # Position jumped back: drop search state tied to the old line
                     else:
                         # In PvP, we only undo once (to the other human's turn)
                         if self.game.undo(): 
@@ -277,10 +317,12 @@ class QuoridorGUI:
                 
                 if event.key == pygame.K_y: 
                     if self.mode == 'PvAI':
+                        self.cancel_ai()
                         # Redo twice to keep sync
                         if len(self.game.redo_stack) >= 2:
                             self.game.redo()
                             self.game.redo()
+                            self.ai.sync()
                             self.show_notification("REDO (2 Steps)")
                     else:
                         if self.game.redo(): 
@@ -293,12 +335,15 @@ class QuoridorGUI:
                         self.show_notification("SAVE FAILED")
                         
                 if event.key == pygame.K_l: 
+                    self.cancel_ai()
                     if self.game.load_game_from_file():
+                        if self.ai: self.ai.reset() # A different game: nothing learned carries over
                         self.show_notification("GAME LOADED")
                     else:
                         self.show_notification("LOAD FAILED")
                         
                 if event.key == pygame.K_m: 
+                    self.cancel_ai()
                     self.state = 'MENU' # Back to Menu
 
             if event.type == pygame.MOUSEBUTTONDOWN and not self.game.winner:
@@ -465,9 +510,10 @@ class QuoridorGUI:
             # Optional: Add a subtle 1px white highlight on top for extra 3D pop
             pygame.draw.line(self.screen, (255, 255, 255), (wx + 2, wy + 2), (wx + w - 2, wy + 2), 1)
 
-    def draw_ghost_wall(self, r, c, orient):
+    def draw_ghost_wall(self, r, c, orient, legal=True):
         # Delegate to the main wall function, passing the specific Ghost Color and Flag
-        self.draw_single_wall(r, c, orient, GHOST_WALL_COLOR, is_ghost=True)
+        color = GHOST_WALL_COLOR if legal else BLOCKED_WALL_COLOR
+        self.draw_single_wall(r, c, orient, color, is_ghost=True)
 
     def draw_hud(self):
         # --- 1. TOP HEADER (Turn Info) ---
@@ -497,6 +543,11 @@ class QuoridorGUI:
         controls_text = "Left Click: Interact   •   S: Save Game   •   L: Load Game   •   Z: Undo"
         self.draw_text(controls_text, pygame.font.SysFont('Arial', 14), (170, 180, 190), SCREEN_WIDTH // 2, SCREEN_HEIGHT - 30)
 
+        # AI "thinking" indicator with animated dots while the search runs
+        if self.search and self.search.active and not self.game.winner:
+            dots = "." * (1 + (pygame.time.get_ticks() // 400) % 3)
+            self.draw_text(f"AI THINKING{dots}", self.font, P2_COLOR, SCREEN_WIDTH // 2, 88)
+
         # --- 3. NOTIFICATION POP-UP (Toast) ---
         if self.notification_timer > 0:
             self.notification_timer -= 1
@@ -527,6 +578,7 @@ class QuoridorGUI:
             
             # Check for click on the "Return to Menu" button
             if pygame.mouse.get_pressed()[0] and menu_rect.collidepoint(pygame.mouse.get_pos()):
+                self.cancel_ai()
                 self.state = 'MENU'
 
     def main_loop(self):
@@ -538,6 +590,7 @@ class QuoridorGUI:
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.cancel_ai()
                     pygame.quit()
                     return
 
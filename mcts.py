@@ -0,0 +1,359 @@
+"""Monte Carlo tree search (PUCT) for QuoridorAI's 'mcts' engine.
+
+Unlike the beam minimax, every legal move, walls included, stays in the
+tree; a prior steers visits towards the promising ones instead:
+
+* pawn steps that shorten the mover's path, then sideways, then back;
+* walls across the opponent's shortest path, earlier on the path first;
+* a trickle for every other wall.
+
+Leaves are scored without a rollout by default: ``tanh`` of the path race
+(distances, the tempo of the side to move and the walls in hand), or exactly
+by the endgame solver once no walls are left and the board is solved already.
+leaf='rollout' instead plays a few shortest-path-guided plies (pawns step
+along their paths, now and then a wall goes across the opponent's) before
+scoring.
+
+Nodes live in flat preallocated arrays, one slot per node, with the children
+of a node in one contiguous block. max_nodes bounds memory up front (about
+24 bytes a node); once the arrays are full the tree stops growing and the
+remaining time refines the existing nodes. After each move the subtree of
+the position actually reached is copied to the front of fresh arrays, so
+its visits carry over to the next search.
+"""
+import math
+import random
+import time
+from array import array
+
+from ai_agent import SearchCancelled
+from bitboard import WALL_MOVE_BASE, cell_index, iter_bits, wall_coords, walls_cutting
+
+C_PUCT = 1.5
+FPU_REDUCTION = 0.2       # Unvisited children count as this much worse than their parent
+RACE_SCALE = 3.0          # Path-length lead worth tanh(1) ~ 0.76
+WALL_VALUE = 0.25         # A wall in hand, in path steps
+ROLLOUT_PLIES = 12
+ROLLOUT_WALL_CHANCE = 0.2
+DEFAULT_NODES = 1 << 19
+NOISE_ALPHA = 0.3         # Dirichlet concentration of the root noise
+
+
+class NodeArrays:
+    """Per-node columns. Slot 0 is the root; children are never in slot 0.
+
+    With a buffer (e.g. a shared memory block of nbytes(size) bytes) the
+    columns are views laid out back to back in it, widest first so each
+    stays aligned; release() must drop them before the buffer is closed.
+    """
+    COLUMNS = (('value', 'd'), ('visits', 'i'), ('first', 'i'), ('prior', 'f'), ('move', 'H'), ('count', 'H'))
+
+    def __init__(self, size, buffer=None):
+        self.size = size
+        self.raw = None if buffer is None else buffer[:self.nbytes(size)]
+        offset = 0
+        for name, code in self.COLUMNS:
+            width = array(code).itemsize * size
+            if buffer is None: column = array(code, bytes(width))
+            else: column = self.raw[offset:offset + width].cast(code)
+            setattr(self, name, column)
+            offset += width
+
+    @classmethod
+    def bytes_per_node(cls):
+        return sum(array(code).itemsize for _, code in cls.COLUMNS)
+
+    @classmethod
+    def nbytes(cls, size):
+        return cls.bytes_per_node() * size
+
+    def clear(self):
+        """Zeroes every node of buffer-backed columns (array columns start zeroed)."""
+        self.raw[:] = bytes(len(self.raw))
+
+    def release(self):
+        if self.raw is None: return
+        for name, _ in self.COLUMNS:
+            getattr(self, name).release()
+        self.raw.release()
+
+
+class MCTS:
+    def __init__(self, game, player_id, max_nodes=DEFAULT_NODES, c_puct=C_PUCT, leaf='eval',
+                 endgame=None, seed=None, root_noise=0.0):
+        if leaf not in ('eval', 'rollout'): raise ValueError(f"Unknown leaf evaluation: {leaf}")
+        self.game = game
+        self.player_id = player_id
+        self.max_nodes = max_nodes
+        self.c_puct = c_puct
+        self.leaf = leaf
+        self.endgame = endgame      # An EndgameSolver, for exact leaves once walls run out
+        self.rng = random.Random(seed)
+        self.root_noise = root_noise  # Share of the root priors replaced by Dirichlet noise
+        self.nodes = None
+        self.used = 0               # Slots taken, root included
+        self.root = None            # snapshot() the tree's root stands for
+        self.iterations = 0         # Playouts in the last search
+        self.reused = 0             # Visits inherited by the last search's root
+
+    def reset(self):
+        self.nodes = None
+        self.root = None
+
+    # --- Search ---
+
+    def search(self, budget_ms=None, iterations=None, should_stop=None):
+        """Best packed move for the side to move after a time and/or playout budget.
+
+        Raises SearchCancelled when should_stop() turns true.
+        """
+        if budget_ms is None and iterations is None: raise ValueError("MCTS needs a time budget or playouts")
+        self._reuse_tree()
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+        nodes = self.nodes
+        if not nodes.count[0] and not self._expand(0): return None
+        self.iterations = 0
+        while True:
+            if iterations is not None and self.iterations >= iterations: break
+            if self.iterations % 32 == 0:
+                if should_stop and should_stop(): raise SearchCancelled()
+                if deadline and time.perf_counter() > deadline and self.iterations: break
+            self._playout()
+            self.iterations += 1
+        return self.best_move()
+
+    def best_move(self):
+        """The root's most visited move (ties: the higher prior)."""
+        nodes = self.nodes
+        start = nodes.first[0]
+        best = max(range(start, start + nodes.count[0]), key=lambda i: (nodes.visits[i], nodes.prior[i]))
+        return nodes.move[best]
+
+    def root_visits(self):
+        """{packed move: (visits, mean value for the mover)} of the root's children."""
+        nodes = self.nodes
+        start = nodes.first[0]
+        return {nodes.move[i]: (nodes.visits[i], nodes.value[i] / nodes.visits[i] if nodes.visits[i] else 0.0)
+                for i in range(start, start + nodes.count[0])}
+
+    def _playout(self):
+        game, nodes = self.game, self.nodes
+        path = [0]
+        records = []
+        slot = 0
+
+        # 1. Select down to a leaf, playing the moves as history-free deltas
+        while nodes.count[slot] and not game.winner:
+            slot = self._select(slot)
+            records.append(self._play(nodes.move[slot]))
+            path.append(slot)
+
+        # 2. Grow the tree by one node's children and score the leaf for its side to move
+        if game.winner:
+            value = -1.0  # The previous mover just won
+        else:
+            if not nodes.first[slot]: self._expand(slot)
+            value = self._rollout() if self.leaf == 'rollout' else self.evaluate()
+
+        # 3. Back up: each node keeps the value for the player who moved into it
+        visits, values = nodes.visits, nodes.value
+        for s in reversed(path):
+            value = -value
+            visits[s] += 1
+            values[s] += value
+        for record in reversed(records):
+            game._revert_record(record)
+
+    def _select(self, slot):
+        nodes = self.nodes
+        visits, values, priors = nodes.visits, nodes.value, nodes.prior
+        n = visits[slot]
+        fpu = (-values[slot] / n if n else 0.0) - FPU_REDUCTION
+        explore = self.c_puct * math.sqrt(n + 1)
+        start = nodes.first[slot]
+        best, best_score = start, -float('inf')
+        for i in range(start, start + nodes.count[slot]):
+            v = visits[i]
+            score = (values[i] / v if v else fpu) + explore * priors[i] / (1 + v)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def _play(self, move):
+        """Applies a packed move for the side to move; returns its history record."""
+        game = self.game
+        player = game.current_turn
+        if move >= WALL_MOVE_BASE:
+            record = game._encode_wall(player, *wall_coords(move - WALL_MOVE_BASE))
+        else:
+            record = game._encode_pawn_move(player, game.player_positions[player], divmod(move, 9))
+        game._apply_record(record)
+        return record
+
+    def _expand(self, slot):
+        """Gives slot its children with their priors. False if the arrays are full."""
+        game = self.game
+        # Generated, not looked up: every leaf is a new position, so the game's
+        # legal-move cache would only fill up and evict the minimax's entries
+        moves = () if game.winner else game._generate_moves(game.current_turn, False)
+        nodes = self.nodes
+        if not moves or self.used + len(moves) > self.max_nodes: return False
+        priors = self.priors(moves)
+        start = self.used
+        for k, move in enumerate(moves):
+            nodes.move[start + k] = move
+            nodes.prior[start + k] = priors[k]
+        nodes.first[slot] = start
+        nodes.count[slot] = len(moves)
+        self.used += len(moves)
+        if slot == 0 and self.root_noise: self._add_noise(start, len(moves))
+        return True
+
+    def _add_noise(self, start, count):
+        """Mixes Dirichlet noise into the priors of the children in start..start+count."""
+        noise = [self.rng.gammavariate(NOISE_ALPHA, 1) for _ in range(count)]
+        total = sum(noise) or 1.0
+        prior, share = self.nodes.prior, self.root_noise
+        for k in range(count):
+            prior[start + k] = (1 - share) * prior[start + k] + share * noise[k] / total
+
+    def priors(self, moves):
+        """Normalised prior for each packed move of the side to move."""
+        game = self.game
+        board = game.board
+        player = game.current_turn
+        opponent = 2 if player == 1 else 1
+        goal, opp_goal = (8, 0) if player == 1 else (0, 8)
+        here = board.distance(cell_index(*game.player_positions[player]), goal)
+        path = board.shortest_path(cell_index(*game.player_positions[opponent]), opp_goal)
+        across = {}  # Wall id -> how far along the opponent's path it cuts
+        for step, (a, b) in enumerate(zip(path, path[1:])):
+            for wall in walls_cutting(a, b):
+                across.setdefault(wall, step)
+
+        weights = []
+        for move in moves:
+            if move < WALL_MOVE_BASE:
+                d = board.distance(move, goal)
+                weights.append(3.0 if d < here else 0.6 if d == here else 0.2)
+            else:
+                step = across.get(move - WALL_MOVE_BASE)
+                weights.append(0.02 if step is None else 1.0 / (1 + 0.3 * step))
+        total = sum(weights)
+        return [w / total for w in weights]
+
+    # --- Leaf evaluation ---
+
+    def evaluate(self):
+        """Value in [-1, 1] of the current position for the side to move."""
+        game = self.game
+        if game.winner: return 1.0 if game.winner == game.current_turn else -1.0
+        player = game.current_turn
+        opponent = 2 if player == 1 else 1
+        # Exact once walls run out, if that board is solved already: solving each
+        # board the last wall could make (~40 ms apiece) would stall the search
+        if self.endgame and not game.walls_left[1] and not game.walls_left[2] and self.endgame.solved(game.board):
+            value = self.endgame.value(game)
+            return (value > 0) - (value < 0)
+        board = game.board
+        mine = board.distance(cell_index(*game.player_positions[player]), 8 if player == 1 else 0)
+        theirs = board.distance(cell_index(*game.player_positions[opponent]), 8 if opponent == 1 else 0)
+        lead = theirs - mine + 0.5 + WALL_VALUE * (game.walls_left[player] - game.walls_left[opponent])
+        return math.tanh(lead / RACE_SCALE)
+
+    def _rollout(self):
+        """A few shortest-path-guided plies, then evaluate(), for the leaf's side to move."""
+        game, rng = self.game, self.rng
+        leaf_player = game.current_turn
+        records = []
+        try:
+            for _ in range(ROLLOUT_PLIES):
+                if game.winner: break
+                move = self._rollout_move(rng)
+                if move is None: break
+                records.append(self._play(move))
+            value = self.evaluate()
+            return value if game.current_turn == leaf_player else -value
+        finally:
+            for record in reversed(records):
+                game._revert_record(record)
+
+    def _rollout_move(self, rng):
+        game = self.game
+        board = game.board
+        player = game.current_turn
+        opponent = 2 if player == 1 else 1
+        cur = cell_index(*game.player_positions[player])
+        if game.walls_left[player] and rng.random() < ROLLOUT_WALL_CHANCE:
+            path = board.shortest_path(cell_index(*game.player_positions[opponent]), 8 if opponent == 1 else 0)
+            walls = [w for a, b in zip(path, path[1:4]) for w in walls_cutting(a, b)
+                     if board.available >> w & 1]
+            rng.shuffle(walls)
+            for wall in walls:
+                if game._keeps_paths(*wall_coords(wall)): return WALL_MOVE_BASE + wall
+        goal = 8 if player == 1 else 0
+        opp = cell_index(*game.player_positions[opponent])
+        targets = [(board.distance(t, goal), rng.random(), t) for t in iter_bits(board.pawn_targets(cur, opp))]
+        return min(targets)[2] if targets else None
+
+    # --- Tree reuse ---
+
+    def _reuse_tree(self):
+        """Re-roots the tree at the current position if the old tree reached it, else starts over."""
+        position = self.game.snapshot()
+        slot = self._find(position) if self.nodes is not None else None
+        if slot is None:
+            self.nodes = self._fresh_nodes()
+            self.used = 1
+        elif slot:
+            self._compact(slot)
+            if self.root_noise and self.nodes.count[0]: self._add_noise(self.nodes.first[0], self.nodes.count[0])
+        self.root = position
+        self.reused = self.nodes.visits[0]
+
+    def _fresh_nodes(self):
+        """Zeroed node arrays for a new or re-rooted tree."""
+        return NodeArrays(self.max_nodes)
+
+    def _find(self, position):
+        """Slot of the node for position, up to two plies below the root."""
+        if position == self.root: return 0
+        from game_logic import QuoridorGame
+
+        scratch = QuoridorGame()
+        scratch.restore_snapshot(self.root)
+        game, self.game = self.game, scratch
+        nodes = self.nodes
+        try:
+            first = range(nodes.first[0], nodes.first[0] + nodes.count[0])
+            for child in sorted(first, key=lambda i: -nodes.visits[i]):  # Our own move is likely the most visited
+                played = self._play(nodes.move[child])
+                if scratch.snapshot() == position: return child
+                for grandchild in range(nodes.first[child], nodes.first[child] + nodes.count[child]):
+                    record = self._play(nodes.move[grandchild])
+                    if scratch.snapshot() == position: return grandchild
+                    scratch._revert_record(record)
+                scratch._revert_record(played)
+            return None
+        finally:
+            self.game = game
+
+    def _compact(self, slot):
+        """Copies the subtree under slot into fresh arrays, slot becoming the root."""
+        old, new = self.nodes, self._fresh_nodes()
+        new.visits[0], new.value[0] = old.visits[slot], old.value[slot]
+        used = 1
+        queue = [(slot, 0)]
+        for src, dst in queue:
+            count = old.count[src]
+            if not count: continue
+            start, old_start = used, old.first[src]
+            new.first[dst], new.count[dst] = start, count
+            for k in range(count):
+                i, j = old_start + k, start + k
+                new.move[j], new.prior[j] = old.move[i], old.prior[i]
+                new.visits[j], new.value[j] = old.visits[i], old.value[i]
+                if old.count[i]: queue.append((i, j))
+            used += count
+        self.nodes, self.used = new, used
+
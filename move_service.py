@@ -0,0 +1,402 @@
+"""Local move service: many games served by one warm pool of AI processes.
+
+Clients talk to an asyncio TCP server in small binary frames, each a uint32
+payload size followed by the payload:
+
+    request   uint32 id, uint8 op, uint16 time budget in ms (0: the server default)
+              + for OP_MOVE, the 24-byte save_format position record
+    response  uint32 id, uint8 status, uint16 packed move, uint32 think time in us
+              + for OP_METRICS, UTF-8 JSON
+
+Each worker process builds its QuoridorAIs once and keeps them, so the
+transposition table, endgame tables and opening book stay resident across
+requests. Requests queue in the server and a dispatcher per worker takes up
+to --batch of them at a time (one round trip to the process for the lot),
+but no more than its share of the queue while other workers sit idle. The
+time a request waited, in the queue or behind the earlier jobs of its batch,
+comes off its budget; the metrics report the budgets the searches actually
+got and how many were cut to the minimum. When more than
+--max-pending requests are waiting, new ones are answered STATUS_BUSY at
+once rather than queued, so callers can back off.
+
+    python move_service.py serve -j 4 --difficulty Hard
+    python move_service.py bench -n 500 -c 32       # against a running server
+    python move_service.py bench --spawn -j 2       # ...or one started in-process
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import json
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import save_format
+from arena import percentile
+from save_format import POSITION
+
+DEFAULT_PORT = 7878
+REQUEST = struct.Struct('<IBH')
+RESPONSE = struct.Struct('<IBHI')
+FRAME = struct.Struct('<I')
+OP_MOVE, OP_METRICS = 0, 1
+STATUS_OK, STATUS_NO_MOVE, STATUS_BUSY, STATUS_BAD_REQUEST, STATUS_ERROR = range(5)
+MIN_BUDGET_MS = 10  # A request that waited out its whole budget still gets this long
+METRICS_WINDOW = 1000  # Latest requests the latency percentiles cover
+
+
+class ServiceBusy(Exception):
+    """The service's queue is full; retry later."""
+
+
+class ServiceError(Exception):
+    """The service rejected the request or failed to answer it."""
+
+
+# --- Worker processes ---
+
+_worker = None  # (game, {player: QuoridorAI}) in each pool process
+
+
+def _init_worker(ai_kwargs):
+    global _worker
+    from ai_agent import QuoridorAI
+    from game_logic import QuoridorGame
+    from opening_book import OpeningBook
+
+    game = QuoridorGame()
+    if ai_kwargs.pop('book', False): ai_kwargs['book'] = OpeningBook.load_default()
+    _worker = (game, {p: QuoridorAI(game, p, **ai_kwargs) for p in (1, 2)})
+
+
+def _search_batch(jobs):
+    """[(position record, budget ms)] -> [(packed move or None, think us, budget ms searched with)]."""
+    from ai_agent import pack_move
+
+    game, ais = _worker
+    results = []
+    batch_started = time.perf_counter()
+    for record, budget in jobs:
+        started = time.perf_counter()
+        budget = max(MIN_BUDGET_MS, budget - (started - batch_started) * 1000)  # Earlier jobs' time counts too
+        game.restore_snapshot(save_format.unpack_position(record))
+        # Requests come from unrelated games: no ordering carried over two plies
+        move = None if game.winner else ais[game.current_turn].get_move(budget, age=False)
+        results.append((pack_move(move) if move else None, int((time.perf_counter() - started) * 1e6), budget))
+    return results
+
+
+# --- Server ---
+
+class MoveService:
+    def __init__(self, workers=2, ai_kwargs=None, default_budget_ms=200, max_pending=256, batch_size=4):
+        self.workers = workers
+        self.ai_kwargs = ai_kwargs or {'difficulty': 'Hard'}
+        self.default_budget_ms = default_budget_ms
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.queue = None
+        self.in_flight = 0
+        self.counters = collections.Counter()  # requests, completed, busy, bad, errors, batches, clamped
+        self.latency_ms = collections.deque(maxlen=METRICS_WINDOW)
+        self.wait_ms = collections.deque(maxlen=METRICS_WINDOW)
+        self.budget_ms = collections.deque(maxlen=METRICS_WINDOW)  # What the searches got after waiting
+        self.idle = 0  # Dispatchers waiting for a request
+        self._pool = None
+        self._server = None
+        self._dispatchers = []
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Starts the worker pool (waiting until every process is warm) and the listener."""
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(dict(self.ai_kwargs),))
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _search_batch, []) for _ in range(self.workers)))
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._dispatchers:
+            task.cancel()
+        if self._pool: self._pool.shutdown(cancel_futures=True)
+
+    def metrics(self):
+        return {
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'in_flight': self.in_flight,
+            'max_pending': self.max_pending,
+            'workers': self.workers,
+            **self.counters,
+            'clamped': self.counters['clamped'],  # Searches cut to MIN_BUDGET_MS by waiting; shown even at 0
+            'avg_batch': self.counters['completed'] / self.counters['batches'] if self.counters['batches'] else 0.0,
+            'latency_ms': {q: percentile(self.latency_ms, q) for q in (50, 90, 99)},
+            'queue_wait_ms': {q: percentile(self.wait_ms, q) for q in (50, 90, 99)},
+            'budget_ms': {q: percentile(self.budget_ms, q) for q in (50, 90, 99)},
+        }
+
+    async def _dispatch(self):
+        """Feeds one worker: takes what is queued (up to batch_size) per round trip.
+
+        Jobs in a batch run one after another, each eating into the next one's
+        budget, so a dispatcher leaves the idle workers their share.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            self.idle += 1
+            try:
+                batch = [await self.queue.get()]
+            finally:
+                self.idle -= 1
+            limit = min(self.batch_size, -(-(1 + self.queue.qsize()) // (1 + self.idle)))
+            while len(batch) < limit and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            now = time.perf_counter()
+            jobs = []
+            for record, budget, queued, _ in batch:
+                self.wait_ms.append((now - queued) * 1000)
+                jobs.append((record, max(MIN_BUDGET_MS, budget - (now - queued) * 1000)))
+            self.in_flight += len(batch)
+            self.counters['batches'] += 1
+            try:
+                results = await loop.run_in_executor(self._pool, _search_batch, jobs)
+            except Exception as e:  # A crashed worker fails its batch, not the service
+                results = [e] * len(batch)
+            finally:
+                self.in_flight -= len(batch)
+            for (_, _, _, future), result in zip(batch, results):
+                if not future.done(): future.set_result(result)
+
+    async def _serve_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                try:
+                    size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+                    payload = await reader.readexactly(size)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                task = asyncio.create_task(self._handle(payload, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _handle(self, payload, writer):
+        request_id, status, move, think_us, extra = 0, STATUS_OK, 0, 0, b''
+        try:
+            request_id, op, budget = REQUEST.unpack_from(payload)
+            if op == OP_METRICS:
+                extra = json.dumps(self.metrics()).encode()
+            elif op != OP_MOVE or len(payload) != REQUEST.size + POSITION.size:
+                raise ValueError("Malformed request")
+            else:
+                status, move, think_us = await self._move(payload[REQUEST.size:], budget)
+        except (struct.error, ValueError):
+            status = STATUS_BAD_REQUEST
+            self.counters['bad'] += 1
+        response = RESPONSE.pack(request_id, status, move, think_us) + extra
+        writer.write(FRAME.pack(len(response)) + response)
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+
+    async def _move(self, record, budget):
+        save_format.unpack_position(record)  # Bad positions never reach a worker
+        self.counters['requests'] += 1
+        if self.queue.qsize() >= self.max_pending:
+            self.counters['busy'] += 1
+            return STATUS_BUSY, 0, 0
+        started = time.perf_counter()
+        budget = budget or self.default_budget_ms
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((record, budget, started, future))
+        result = await future
+        if isinstance(result, Exception):
+            self.counters['errors'] += 1
+            return STATUS_ERROR, 0, 0
+        self.counters['completed'] += 1
+        self.latency_ms.append((time.perf_counter() - started) * 1000)
+        move, think_us, searched_ms = result
+        self.budget_ms.append(searched_ms)
+        if searched_ms <= MIN_BUDGET_MS < budget: self.counters['clamped'] += 1
+        if move is None: return STATUS_NO_MOVE, 0, think_us
+        return STATUS_OK, move, think_us
+
+
+# --- Client ---
+
+class MoveClient:
+    """Asyncio client; any number of requests can be outstanding on one connection."""
+    def __init__(self):
+        self._reader = self._writer = None
+        self._next_id = 0
+        self._pending = {}
+        self._listener = None
+
+    async def connect(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._listener = asyncio.create_task(self._listen())
+        return self
+
+    async def _listen(self):
+        try:
+            while True:
+                size, = FRAME.unpack(await self._reader.readexactly(FRAME.size))
+                payload = await self._reader.readexactly(size)
+                request_id = RESPONSE.unpack_from(payload)[0]
+                future = self._pending.pop(request_id, None)
+                if future and not future.done(): future.set_result(payload)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            for future in self._pending.values():
+                if not future.done(): future.set_exception(ServiceError(f"Connection lost: {e}"))
+            self._pending.clear()
+
+    async def _request(self, op, budget_ms=0, body=b''):
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        payload = REQUEST.pack(self._next_id, op, budget_ms) + body
+        self._writer.write(FRAME.pack(len(payload)) + payload)
+        await self._writer.drain()
+        payload = await future
+        return RESPONSE.unpack_from(payload), payload[RESPONSE.size:]
+
+    async def get_move(self, snapshot, budget_ms=None):
+        """(packed move or None, think ms) for a QuoridorGame.snapshot().
+
+        Raises ServiceBusy when the server is saturated.
+        """
+        (_, status, move, think_us), _ = await self._request(
+            OP_MOVE, min(budget_ms or 0, 0xFFFF), save_format.pack_position(snapshot))
+        if status == STATUS_BUSY: raise ServiceBusy("Move service queue is full")
+        if status not in (STATUS_OK, STATUS_NO_MOVE): raise ServiceError(f"Move service returned status {status}")
+        return (move if status == STATUS_OK else None), think_us / 1000
+
+    async def metrics(self):
+        _, body = await self._request(OP_METRICS)
+        return json.loads(body)
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self._writer.wait_closed()
+        if self._listener: self._listener.cancel()
+
+
+# --- Command line ---
+
+def sample_positions(count, seed=0, max_plies=60):
+    """Positions from random legal play, for load tests."""
+    from game_logic import QuoridorGame
+
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = QuoridorGame()
+        for _ in range(rng.randint(0, max_plies)):
+            moves = game.legal_moves()
+            if game.winner or not moves: break
+            move = game.decode_move(rng.choice(moves))
+            player = game.current_turn
+            if move[0] == 'move': game.move_pawn(player, move[1], move[2])
+            else: game.place_wall(player, move[1], move[2], move[3])
+        if not game.winner: positions.append(game.snapshot())
+    return positions
+
+
+async def run_bench(host, port, requests, concurrency, budget_ms, seed=0):
+    """Fires requests from `concurrency` callers at once; returns a summary dict."""
+    positions = sample_positions(requests, seed)
+    client = await MoveClient().connect(host, port)
+    latencies, busy = [], 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(snapshot):
+        nonlocal busy
+        async with limit:
+            started = time.perf_counter()
+            try:
+                await client.get_move(snapshot, budget_ms)
+            except ServiceBusy:
+                busy += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in positions))
+    elapsed = time.perf_counter() - started
+    summary = {
+        'requests': requests, 'answered': len(latencies), 'busy': busy,
+        'moves_per_s': len(latencies) / elapsed,
+        'latency_ms': {q: percentile(latencies, q) for q in (50, 90, 99)},
+        'server': await client.metrics(),
+    }
+    await client.close()
+    return summary
+
+
+async def _serve(args):
+    service = MoveService(args.workers, _ai_kwargs(args), args.budget, args.max_pending, args.batch)
+    host, port = await service.start(args.host, args.port)
+    print(f"Move service on {host}:{port} with {args.workers} workers", file=sys.stderr)
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+async def _bench(args):
+    service = None
+    if args.spawn:
+        service = MoveService(args.workers, _ai_kwargs(args), args.budget, args.max_pending, args.batch)
+        args.host, args.port = await service.start(args.host, 0)
+    try:
+        summary = await run_bench(args.host, args.port, args.requests, args.concurrency, args.budget, args.seed)
+    finally:
+        if service: await service.close()
+    print(json.dumps(summary, indent=2))
+
+
+def _ai_kwargs(args):
+    kwargs = {'difficulty': args.difficulty, 'book': args.difficulty == 'Hard'}
+    if args.depth: kwargs['depth'] = args.depth
+    return kwargs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve QuoridorAI moves to many games over a local socket.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="Run the service")
+    bench = sub.add_parser('bench', help="Load-test a service with concurrent requests")
+    for p in (serve, bench):
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=DEFAULT_PORT)
+        p.add_argument('-j', '--workers', type=int, default=2)
+        p.add_argument('--difficulty', default='Hard')
+        p.add_argument('--depth', type=int, help="Caps iterative deepening")
+        p.add_argument('--budget', type=int, default=200, help="Time budget per move in ms")
+        p.add_argument('--max-pending', type=int, default=256, help="Queued requests before answering busy")
+        p.add_argument('--batch', type=int, default=4, help="Requests handed to a worker per round trip")
+    bench.add_argument('-n', '--requests', type=int, default=200)
+    bench.add_argument('-c', '--concurrency', type=int, default=16)
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--spawn', action='store_true', help="Start a service in this process to test against")
+    args = parser.parse_args(argv)
+    asyncio.run(_serve(args) if args.command == 'serve' else _bench(args))
+
+
+if __name__ == '__main__':
+    main()
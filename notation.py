@@ -0,0 +1,153 @@
+"""Algebraic move notation and a fast replay engine.
+
+Files a-i are columns 0-8 and ranks 1-9 rows 0-8, so player 1 starts on e1
+and player 2 on e9. A pawn move is the target square (``e2``). A wall is
+named by the lower-left square of the four it touches plus its orientation:
+``e3h`` is the horizontal wall at (2, 4), between ranks 3 and 4 across files
+e and f; ``e3v`` the vertical one between files e and f across ranks 3 and 4.
+
+A game is written as numbered move pairs, ``1. e2 e8 2. e3h d7v ...``;
+parse_game() also accepts the plies bare.
+"""
+import re
+
+from bitboard import WALL_MOVE_BASE, cell_coords, cell_index, wall_coords, wall_id
+
+FILES = 'abcdefghi'
+_MOVE = re.compile(r'^([a-i])([1-9])([hv]?)$')
+_MOVE_NUMBER = re.compile(r'^\d+\.+$')
+
+
+def square(r, c):
+    return f"{FILES[c]}{r + 1}"
+
+
+def move_text(move):
+    """Packed move (see QuoridorGame.legal_moves) -> 'e2' / 'e3h'."""
+    if move >= WALL_MOVE_BASE:
+        r, c, orientation = wall_coords(move - WALL_MOVE_BASE)
+        return square(r, c) + orientation.lower()
+    return square(*cell_coords(move))
+
+
+def parse_move(text):
+    """'e2' / 'e3h' -> packed move. Raises ValueError on bad notation."""
+    match = _MOVE.match(text.strip().lower())
+    if not match: raise ValueError(f"Bad move '{text}'")
+    file, rank, orientation = match.groups()
+    r, c = int(rank) - 1, FILES.index(file)
+    if not orientation: return cell_index(r, c)
+    if r > 7 or c > 7: raise ValueError(f"No wall at '{text}'")
+    return WALL_MOVE_BASE + wall_id(r, c, orientation.upper())
+
+
+def tuple_text(move):
+    """Move tuple (('move', r, c, ...) or ('wall', r, c, orientation)) -> notation."""
+    if move[0] == 'wall': return square(move[1], move[2]) + move[3].lower()
+    return square(move[1], move[2])
+
+
+def record_text(record):
+    """QuoridorGame history record -> notation."""
+    if record & 0x8000:
+        r, c = divmod(record & 63, 8)
+        return square(r, c) + ('v' if record & 64 else 'h')
+    return square(*cell_coords(record & 127))
+
+
+def play(game, text):
+    """Plays one move for the side to move. Raises ValueError if it's illegal."""
+    move = game.decode_move(parse_move(text))
+    player = game.current_turn
+    ok = (game.move_pawn(player, move[1], move[2]) if move[0] == 'move'
+          else game.place_wall(player, move[1], move[2], move[3]))
+    if not ok: raise ValueError(f"Illegal move '{text}' at ply {len(game.history) + 1}")
+
+
+def format_game(records):
+    """History records -> '1. e2 e8 2. e3h d7v ...'."""
+    parts = []
+    for ply, record in enumerate(records):
+        if ply % 2 == 0: parts.append(f"{ply // 2 + 1}.")
+        parts.append(record_text(record))
+    return ' '.join(parts)
+
+
+def parse_game(text, game=None):
+    """Plays a game written in notation on game (default: a new QuoridorGame) and returns it.
+
+    Every move goes through the rules, so a bad game raises ValueError.
+    """
+    if game is None:
+        from game_logic import QuoridorGame
+        game = QuoridorGame()
+    for token in text.split():
+        if _MOVE_NUMBER.match(token): continue
+        play(game, token)
+    return game
+
+
+class Replay:
+    """Any ply of a recorded game, rebuilt from the nearest checkpoint.
+
+    The moves are applied once up front to store a snapshot() every
+    `checkpoint_every` plies. After that, seek() restores the closest
+    checkpoint and applies the remaining move records as deltas (no rule
+    checks, no history), so it costs at most checkpoint_every / 2 deltas in
+    either direction, and stepping to a neighbouring ply costs one.
+    """
+    def __init__(self, start, records, checkpoint_every=16):
+        from game_logic import QuoridorGame
+
+        self.records = list(records)
+        self.checkpoint_every = checkpoint_every
+        self.board = QuoridorGame()  # Scratch game at ply self.ply
+        self.board.restore_snapshot(start)
+        self.checkpoints = [start]
+        for ply, record in enumerate(self.records, 1):
+            self.board._apply_record(record)
+            if ply % checkpoint_every == 0: self.checkpoints.append(self.board.snapshot())
+        self.ply = len(self.records)
+
+    @classmethod
+    def from_game(cls, game, checkpoint_every=16):
+        """Replay of a QuoridorGame's history, redo-able plies included."""
+        records = game.history.tolist() + game.redo_stack[::-1].tolist()
+        return cls(game.checkpoints[0], records, checkpoint_every)
+
+    @classmethod
+    def from_text(cls, text, checkpoint_every=16):
+        game = parse_game(text)
+        return cls(game.checkpoints[0], game.history, checkpoint_every)
+
+    def __len__(self):
+        return len(self.records)
+
+    def seek(self, ply):
+        """Moves the scratch game to ply and returns it (don't play moves on it)."""
+        if not 0 <= ply <= len(self.records): raise IndexError(f"No ply {ply} in replay")
+        # 1. Jump to the nearest checkpoint unless walking from here is shorter
+        every = self.checkpoint_every
+        base = ply // every * every
+        if base + every < len(self.checkpoints) * every and base + every - ply < ply - base:
+            base += every  # The next checkpoint is closer
+        if abs(ply - self.ply) > abs(ply - base):
+            self.board.restore_snapshot(self.checkpoints[base // every])
+            self.ply = base
+
+        # 2. Walk the remaining plies as deltas
+        board, records = self.board, self.records
+        while self.ply < ply:
+            board._apply_record(records[self.ply])
+            self.ply += 1
+        while self.ply > ply:
+            self.ply -= 1
+            board._revert_record(records[self.ply])
+        return board
+
+    def position(self, ply):
+        """snapshot() after ply plies."""
+        return self.seek(ply).snapshot()
+
+    def text(self):
+        return format_game(self.records)
@@ -0,0 +1,158 @@
+"""Opening book: precomputed replies for the first few plies.
+
+The book file is a small header followed by fixed-size entries sorted by
+position key, so a lookup is a binary search over a memory-mapped file:
+
+    magic  b'QBK1'
+    uint32 entry count
+    count x (uint64 zobrist key, uint16 packed move, uint16 search depth)
+
+Keys are the Zobrist hashes from transposition.py (fixed seed, side to move
+included) and moves use the QuoridorGame.legal_moves packing. Build a book
+offline with
+
+    python opening_book.py build -o opening_book.bin --plies 6 --depth 5
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from game_logic import QuoridorGame
+from transposition import zobrist_hash
+
+MAGIC = b'QBK1'
+HEADER = struct.Struct('<4sI')
+ENTRY = struct.Struct('<QHH')
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_BOOK):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or len(self._data) != HEADER.size + self.count * ENTRY.size:
+            self._data.close()
+            raise ValueError(f"{path} is not an opening book")
+
+    @classmethod
+    def load_default(cls):
+        """The book shipped next to this module, or None if there isn't one."""
+        try:
+            return cls(DEFAULT_BOOK)
+        except (OSError, ValueError):
+            return None
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key):
+        """(packed move, depth) stored for a position key, or None."""
+        data, lo, hi = self._data, 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_key, move, depth = ENTRY.unpack_from(data, HEADER.size + mid * ENTRY.size)
+            if entry_key == key: return move, depth
+            if entry_key < key: lo = mid + 1
+            else: hi = mid
+        return None
+
+    def get_move(self, game, player):
+        """Book reply (as a move tuple) for player in game, or None when out of book."""
+        if game.current_turn != player: return None
+        hit = self.lookup(zobrist_hash(game))
+        if hit is None: return None
+        move = hit[0]
+        # A book built by an older rules/hash version must not play illegal moves
+        if move not in game.legal_moves(player): return None
+        return game.decode_move(move, player)
+
+    def close(self):
+        self._data.close()
+
+
+def write_book(path, entries):
+    """Writes {key: (packed move, depth)} as a book file."""
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries)))
+        for key in sorted(entries):
+            move, depth = entries[key]
+            f.write(ENTRY.pack(key, move, depth))
+
+
+def build_book(path, plies=6, depth=5, beam_width=4, branching=3, log=print):
+    """Searches every position up to `plies` deep and writes their best replies.
+
+    From each position the tree follows the `branching` best-looking moves
+    (the search's own root candidates), so it covers the book move and the
+    most likely deviations for both sides.
+    """
+    from ai_agent import QuoridorAI, pack_move
+
+    game = QuoridorGame()
+    ais = {p: QuoridorAI(game, p, 'Hard', depth=depth, beam_width=beam_width) for p in (1, 2)}
+    entries = {}
+    started = time.perf_counter()
+
+    def visit(ply):
+        key = zobrist_hash(game)
+        if key in entries or game.winner: return
+        ai = ais[game.current_turn]
+        ai.reset()
+        best = ai.minimax_root(depth, beam_width)
+        ai.begin_search()
+        try:
+            followed = ai.root_candidates(branching)
+        finally:
+            ai.end_search()
+        if best is None: return
+        entries[key] = (pack_move(best), depth)
+        if len(entries) % 50 == 0:
+            log(f"{len(entries)} positions, {time.perf_counter() - started:.0f}s")
+        if ply + 1 >= plies: return
+
+        # 1. Follow the book move and the likeliest alternatives
+        if best not in followed: followed.append(best)
+        for move in followed:
+            player = game.current_turn
+            ok = (game.move_pawn(player, move[1], move[2]) if move[0] == 'move'
+                  else game.place_wall(player, move[1], move[2], move[3]))
+            if not ok: continue
+            try:
+                visit(ply + 1)
+            finally:
+                game.undo()
+
+    visit(0)
+    write_book(path, entries)
+    log(f"Wrote {len(entries)} positions to {path} in {time.perf_counter() - started:.0f}s")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a Quoridor opening book.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Search the opening tree and write a book")
+    build.add_argument('-o', '--out', default=DEFAULT_BOOK)
+    build.add_argument('--plies', type=int, default=6, help="Plies from the start position to cover")
+    build.add_argument('--depth', type=int, default=5, help="Search depth per position")
+    build.add_argument('--beam', type=int, default=4)
+    build.add_argument('--branching', type=int, default=3, help="Moves followed from each position")
+    show = sub.add_parser('show', help="Print a book's size and its reply to the start position")
+    show.add_argument('path', nargs='?', default=DEFAULT_BOOK)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build_book(args.out, args.plies, args.depth, args.beam, args.branching)
+    else:
+        book = OpeningBook(args.path)
+        game = QuoridorGame()
+        print(f"{args.path}: {len(book)} positions, start -> {book.get_move(game, 1)}")
+        book.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Root-parallel MCTS for QuoridorAI: one tree per worker, merged by visit counts.
+
+Every tree keeps its nodes in its own multiprocessing.shared_memory block:
+a stop flag, then two halves of max_nodes slots (see mcts.NodeArrays). A
+search grows one half; re-rooting after a move copies the kept subtree into
+the other. The parent holds the blocks and each tree's small bookkeeping
+(active half, slots used, root position), so any pool process can carry on
+any tree, and the merge reads the root children straight out of shared
+memory instead of pickling trees back.
+
+The trees differ by the Dirichlet noise mixed into their root priors (tree 0
+has none, so it is the serial search). Searching one shared tree from every
+process, with virtual loss, would need atomic updates that Python's shared
+memory does not offer; independent trees need no locking at all, so
+playouts per second should grow with the number of cores.
+
+python parallel_mcts.py -j 4 prints the scaling curve from 1 to 4 workers.
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+
+from ai_agent import SearchCancelled
+from game_logic import QuoridorGame
+from mcts import DEFAULT_NODES, MCTS, NodeArrays
+
+ROOT_NOISE = 0.25  # Share of the root priors replaced by noise in trees 1..N-1
+HEADER = 8         # Stop flag, padded so the columns stay aligned
+POLL_SECONDS = 0.01
+
+_trees = {}  # Block name -> SharedMCTS, attached once per worker process
+
+
+def block_size(max_nodes):
+    return HEADER + 2 * NodeArrays.nbytes(max_nodes)
+
+
+def node_halves(buffer, max_nodes):
+    """The two NodeArrays views of a tree block."""
+    half = NodeArrays.nbytes(max_nodes)
+    return [NodeArrays(max_nodes, buffer[HEADER + k * half:HEADER + (k + 1) * half]) for k in (0, 1)]
+
+
+class SharedMCTS(MCTS):
+    """MCTS whose node arrays are the two halves of a shared memory block."""
+
+    def __init__(self, game, player_id, buffer, max_nodes, **kwargs):
+        super().__init__(game, player_id, max_nodes, **kwargs)
+        self.buffer = buffer
+        self.halves = node_halves(buffer, max_nodes)
+        self.half = None  # Index of the half self.nodes is
+
+    def _fresh_nodes(self):
+        self.half = 1 if self.half == 0 else 0
+        nodes = self.halves[self.half]
+        nodes.clear()
+        return nodes
+
+    def reset(self):
+        super().reset()
+        self.half = None
+
+    @property
+    def state(self):
+        """What the parent keeps between searches: (half, used, root)."""
+        return (self.half, self.used, self.root)
+
+    @state.setter
+    def state(self, state):
+        self.half, self.used, self.root = state or (None, 0, None)
+        self.nodes = None if self.half is None else self.halves[self.half]
+
+
+def _search_tree(name, index, player_id, max_nodes, endgame, state, snapshot, budget_ms, playouts):
+    """Worker side: grows tree index from state. Returns (state, playouts, cancelled)."""
+    tree = _trees.get(name)
+    if tree is None:
+        from endgame import EndgameSolver
+
+        block = SharedMemory(name=name)
+        tree = _trees[name] = SharedMCTS(QuoridorGame(), player_id, block.buf, max_nodes,
+                                         endgame=EndgameSolver() if endgame else None,
+                                         seed=index, root_noise=ROOT_NOISE if index else 0.0)
+        tree.block = block  # Keeps the mapping open for the worker's lifetime
+    tree.state = state
+    tree.game.restore_snapshot(snapshot)
+    try:
+        tree.search(budget_ms, playouts, should_stop=lambda: tree.buffer[0])
+        return tree.state, tree.iterations, False
+    except SearchCancelled:
+        return tree.state, tree.iterations, True
+
+
+class RootParallelMCTS:
+    """Same interface as mcts.MCTS (search, root_visits, reset), over a process pool."""
+
+    def __init__(self, game, player_id, workers, max_nodes=DEFAULT_NODES, endgame=True):
+        self.game = game
+        self.player_id = player_id
+        self.workers = workers
+        self.max_nodes = max_nodes
+        self.endgame = endgame
+        self.blocks = [SharedMemory(create=True, size=block_size(max_nodes)) for _ in range(workers)]
+        self.views = [node_halves(block.buf, max_nodes) for block in self.blocks]
+        self.states = [None] * workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.iterations = 0  # Playouts in the last search, all trees together
+        self.merged = {}     # Packed move -> (visits, value sum) over every tree
+
+    def search(self, budget_ms=None, iterations=None, should_stop=None):
+        if budget_ms is None and iterations is None: raise ValueError("MCTS needs a time budget or playouts")
+        # The budget holds for the whole call: a tree still waiting for a free process is stopped with the rest
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+        snapshot = self.game.snapshot()
+        share = None if iterations is None else math.ceil(iterations / self.workers)
+        for block in self.blocks:
+            block.buf[0] = 0
+        futures = [self.pool.submit(_search_tree, block.name, k, self.player_id, self.max_nodes, self.endgame,
+                                    self.states[k], snapshot, budget_ms, share)
+                   for k, block in enumerate(self.blocks)]
+
+        # 1. Wait, passing a stop request or the deadline on through the blocks' flags
+        cancelled = False
+        pending = futures
+        while pending:
+            _, pending = wait(pending, POLL_SECONDS, FIRST_COMPLETED)
+            if not pending: break
+            cancelled = bool(should_stop and should_stop())
+            if cancelled or (deadline is not None and time.perf_counter() > deadline):
+                for block in self.blocks:
+                    block.buf[0] = 1
+                wait(pending)
+                break
+
+        # 2. Keep each tree's bookkeeping; a tree is consistent between playouts, so even a stopped one stays
+        self.iterations = 0
+        for k, future in enumerate(futures):
+            self.states[k], playouts, _ = future.result()
+            self.iterations += playouts
+        if cancelled: raise SearchCancelled()
+
+        # 3. Merge the root children of every tree
+        self.merged = {}
+        for k, state in enumerate(self.states):
+            if state[0] is None: continue
+            nodes = self.views[k][state[0]]
+            start = nodes.first[0]
+            for i in range(start, start + nodes.count[0]):
+                visits, value = self.merged.get(nodes.move[i], (0, 0.0))
+                self.merged[nodes.move[i]] = (visits + nodes.visits[i], value + nodes.value[i])
+        if not self.merged: return None
+        return max(self.merged, key=lambda m: self.merged[m])
+
+    def root_visits(self):
+        """{packed move: (visits, mean value for the mover)} summed over the trees."""
+        return {move: (visits, value / visits if visits else 0.0) for move, (visits, value) in self.merged.items()}
+
+    def reset(self):
+        self.states = [None] * self.workers
+        self.merged = {}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        for halves in self.views:
+            for nodes in halves:
+                nodes.release()
+        self.views = []
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def scaling(max_workers, budget_ms=1000, max_nodes=DEFAULT_NODES, positions=3, seed=0):
+    """[(workers, playouts per second)] at a fixed time budget, for 1..max_workers."""
+    from move_service import sample_positions
+
+    starts = sample_positions(positions, seed, max_plies=20)
+    curve = []
+    for workers in range(1, max_workers + 1):
+        search = RootParallelMCTS(QuoridorGame(), 1, workers, max_nodes)
+        try:
+            search.search(budget_ms=50)  # Forks and warms the pool outside the timing
+            playouts = seconds = 0
+            for start in starts:
+                search.game.restore_snapshot(start)
+                search.reset()
+                began = time.perf_counter()
+                search.search(budget_ms=budget_ms)
+                seconds += time.perf_counter() - began
+                playouts += search.iterations
+        finally:
+            search.close()
+        curve.append((workers, playouts / seconds))
+    return curve
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure root-parallel MCTS throughput from 1 to N workers.")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Largest worker count (default: CPUs)")
+    parser.add_argument('--budget', type=float, default=1000, help="Milliseconds per search")
+    parser.add_argument('--nodes', type=int, default=DEFAULT_NODES, help="Node slots per tree")
+    parser.add_argument('--positions', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    curve = scaling(args.workers, args.budget, args.nodes, args.positions)
+    print(f"{'workers':>7} {'playouts/s':>11} {'speed-up':>9} {'efficiency':>10}")
+    base = curve[0][1]
+    for workers, rate in curve:
+        print(f"{workers:>7} {rate:>11.0f} {rate / base:>8.2f}x {rate / base / workers:>9.0%}")
+    print(f"({os.cpu_count()} CPUs)")
+
+
+if __name__ == '__main__':
+    main()
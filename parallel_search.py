@@ -0,0 +1,118 @@
+"""Root-splitting parallel search for QuoridorAI.
+
+The root candidates are dealt round-robin to a pool of worker processes.
+Each worker keeps its own QuoridorGame and QuoridorAI (so its transposition
+table stays warm between calls), loads the position from a compact snapshot
+and scores its share of the moves with the ordinary serial minimax.
+
+A stop request reaches the workers through a shared byte the pool is created
+with: each worker's AI reads it as its stop_requested, so minimax notices it
+at the next node, as it does in a serial search.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import RawValue
+
+from ai_agent import QuoridorAI, SearchCancelled, SearchTimeout
+from game_logic import QuoridorGame
+from search_stats import SearchStats
+
+POLL_SECONDS = 0.01
+
+_worker_ai = None  # One warm AI per worker process
+_worker_root = None  # Snapshot the worker last searched, to age its table on a new one
+
+
+class _StopFlag:
+    """Truthy while the parent has set the shared stop byte."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __bool__(self):
+        return self.value.value != 0
+
+
+def _init_worker(player_id, difficulty, tt_size, tt_policy, stop):
+    global _worker_ai
+    _worker_ai = QuoridorAI(QuoridorGame(), player_id, difficulty, tt_size, tt_policy)
+    _worker_ai.stop_requested = _StopFlag(stop)
+
+
+def _score_chunk(snapshot, moves, depth, beam_width, seconds_left, collect_stats):
+    """Worker side: (scores of moves, or None on timeout or stop, nodes searched, SearchStats or None)."""
+    global _worker_root
+    ai = _worker_ai
+    if snapshot != _worker_root and ai.tt: ai.tt.new_search()
+    _worker_root = snapshot
+    ai.game.restore_snapshot(snapshot)
+    ai.stats = ai.game.stats = SearchStats() if collect_stats else None
+    nodes_before = ai.nodes
+    deadline = None if seconds_left is None else time.perf_counter() + seconds_left
+    ai.begin_search(deadline)
+    try:
+        scores = ai.score_root_moves(moves, depth, beam_width)
+    except SearchTimeout:
+        scores = None
+    finally:
+        ai.end_search()
+        ai.game.stats = None
+    stats, ai.stats = ai.stats, None
+    return scores, ai.nodes - nodes_before, stats
+
+
+class RootSplitSearch:
+    def __init__(self, workers, player_id, difficulty, tt_size=1 << 16, tt_policy='depth'):
+        self.workers = workers
+        self.stop = RawValue('b', 0)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(player_id, difficulty, tt_size, tt_policy, self.stop))
+        self.nodes = 0  # Nodes the workers searched in the last call, finished or not
+
+    def score_root_moves(self, game, moves, depth, beam_width, deadline=None, should_stop=None, stats=None):
+        """Same result as QuoridorAI.score_root_moves, computed by the pool.
+
+        deadline is a time.perf_counter() value; workers get the time that is
+        left rather than the timestamp, since clocks are per process.
+        should_stop is polled while the workers run; once it returns true they
+        are stopped and SearchCancelled is raised. The workers' counters are
+        added to stats, if given. Raises SearchTimeout if any worker ran out
+        of time.
+        """
+        snapshot = game.snapshot()
+        seconds_left = None if deadline is None else deadline - time.perf_counter()
+
+        # Round-robin so every worker starts with one of the best-looking moves
+        chunks = [moves[i::self.workers] for i in range(self.workers)]
+        self.stop.value = 0
+        futures = [self.pool.submit(_score_chunk, snapshot, chunk, depth, beam_width, seconds_left,
+                                    stats is not None)
+                   for chunk in chunks if chunk]
+
+        # 1. Wait, passing a stop request on through the shared flag
+        cancelled = False
+        pending = futures
+        while pending:
+            _, pending = wait(pending, POLL_SECONDS, FIRST_COMPLETED)
+            if pending and should_stop and should_stop():
+                self.stop.value = 1
+                wait(pending)
+                cancelled = True
+                break
+
+        # 2. Collect the scores and what every worker searched
+        scores = {}
+        timed_out = False
+        self.nodes = 0
+        for future in futures:
+            part, nodes, worker_stats = future.result()
+            self.nodes += nodes
+            if stats is not None and worker_stats is not None: stats.merge(worker_stats)
+            if part is None: timed_out = True
+            else: scores.update(part)
+        if cancelled: raise SearchCancelled()
+        if timed_out: raise SearchTimeout()
+        return scores
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
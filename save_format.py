@@ -0,0 +1,191 @@
+"""Versioned binary save files for games and positions (replaces pickle).
+
+Every file starts with an 8-byte header, followed by a body of the kind it
+names:
+
+    magic   b'QSAV'
+    uint8   format version (FORMAT_VERSION)
+    uint8   kind: b'G' one game, b'P' a position archive
+    uint16  reserved (0)
+
+A position is a fixed 24-byte record:
+
+    uint64  horizontal wall slot mask (bit r * 8 + c)
+    uint64  vertical wall slot mask
+    uint8   player 1 cell, player 2 cell (r * 9 + c)
+    uint8   player 1 walls left, player 2 walls left
+    uint8   side to move, winner (0 = none)
+    2 bytes padding
+
+A game is its start position, then uint16 ply count and uint16 cursor (the
+plies actually played; the rest can be redone), then one uint16 move record
+per ply, in the QuoridorGame history encoding. Loading replays the records
+through the rules, so a damaged or hand-made file can't produce an illegal
+position. A position archive is just records back to back; its length
+follows from the file size, so it can be appended to and is read through
+mmap one record at a time.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from bitboard import NUM_CELLS, BitBoard, cell_coords, cell_index, iter_bits
+
+MAGIC = b'QSAV'
+FORMAT_VERSION = 1
+KIND_GAME = b'G'
+KIND_POSITIONS = b'P'
+HEADER = struct.Struct('<4sBcH')
+POSITION = struct.Struct('<QQBBBBBB2x')
+PLIES = struct.Struct('<HH')
+
+
+def pack_header(kind):
+    return HEADER.pack(MAGIC, FORMAT_VERSION, kind, 0)
+
+
+def check_header(data, kind, path='file'):
+    """Raises ValueError unless data starts with a current header of this kind."""
+    if len(data) < HEADER.size: raise ValueError(f"{path} is not a Quoridor save")
+    magic, version, found, _ = HEADER.unpack_from(data, 0)
+    if magic != MAGIC: raise ValueError(f"{path} is not a Quoridor save")
+    if version != FORMAT_VERSION: raise ValueError(f"{path} has unsupported save version {version}")
+    if found != kind: raise ValueError(f"{path} holds {found.decode(errors='replace')!r} records, not {kind.decode()!r}")
+
+
+def pack_position(snapshot):
+    """24-byte record of a QuoridorGame.snapshot()."""
+    p1, p2, w1, w2, turn, winner, h_walls, v_walls = snapshot
+    return POSITION.pack(h_walls, v_walls, cell_index(*p1), cell_index(*p2), w1, w2, turn, winner or 0)
+
+
+def unpack_position(data, offset=0):
+    """snapshot() tuple of the record at offset. Raises ValueError if it isn't a valid position."""
+    h_walls, v_walls, c1, c2, w1, w2, turn, winner = POSITION.unpack_from(data, offset)
+    if c1 >= NUM_CELLS or c2 >= NUM_CELLS or c1 == c2: raise ValueError("Bad pawn cells in position")
+    if w1 > 10 or w2 > 10 or turn not in (1, 2) or winner > 2: raise ValueError("Bad counters in position")
+    board = BitBoard()
+    for mask, orientation in ((h_walls, 'H'), (v_walls, 'V')):
+        for s in iter_bits(mask):
+            r, c = divmod(s, 8)
+            if board.wall_conflicts(r, c, orientation): raise ValueError("Overlapping walls in position")
+            board.place_wall(r, c, orientation)
+    return (cell_coords(c1), cell_coords(c2), w1, w2, turn, winner or None, h_walls, v_walls)
+
+
+def _records_to_bytes(records):
+    records = array('H', records)
+    if sys.byteorder == 'big': records.byteswap()
+    return records.tobytes()
+
+
+def _records_from_bytes(data):
+    records = array('H')
+    records.frombytes(data)
+    if sys.byteorder == 'big': records.byteswap()
+    return records
+
+
+# --- Games ---
+
+def encode_game(game):
+    """Bytes of a game file: start position plus every ply, redo-able ones included."""
+    records = game.history.tolist() + game.redo_stack[::-1].tolist()
+    return b''.join((pack_header(KIND_GAME), pack_position(game.checkpoints[0]),
+                     PLIES.pack(len(records), len(game.history)), _records_to_bytes(records)))
+
+
+def decode_game(data, game, path='file'):
+    """Loads a game file's bytes into game (a QuoridorGame), replaying every ply.
+
+    Raises ValueError, leaving game untouched, if the data is damaged or a
+    ply is illegal.
+    """
+    check_header(data, KIND_GAME, path)
+    offset = HEADER.size
+    if len(data) < offset + POSITION.size + PLIES.size: raise ValueError(f"{path} is truncated")
+    start = unpack_position(data, offset)
+    count, cursor = PLIES.unpack_from(data, offset + POSITION.size)
+    body = data[offset + POSITION.size + PLIES.size:]
+    if len(body) != 2 * count or cursor > count: raise ValueError(f"{path} is truncated")
+
+    # 1. Replay into a scratch game so a bad ply can't leave game half loaded
+    scratch = type(game)(game.checkpoint_every)
+    scratch.restore_snapshot(start)
+    for ply, record in enumerate(_records_from_bytes(body)):
+        player = (record >> 14 & 1) + 1
+        if record & 0x8000:
+            r, c = divmod(record & 63, 8)
+            ok = scratch.place_wall(player, r, c, 'V' if record & 64 else 'H')
+        else:
+            ok = scratch.move_pawn(player, *cell_coords(record & 127)) if record & 127 < NUM_CELLS else False
+        if not ok or scratch.history[-1] != record: raise ValueError(f"{path}: illegal move at ply {ply + 1}")
+
+    # 2. Step back to the saved cursor, keeping the rest as redo
+    for _ in range(count - cursor):
+        scratch.undo()
+    game.__dict__.update(scratch.__dict__)
+    return game
+
+
+def save_game(path, game):
+    with open(path, 'wb') as f:
+        f.write(encode_game(game))
+
+
+def load_game(path, game):
+    with open(path, 'rb') as f:
+        return decode_game(f.read(), game, path)
+
+
+# --- Position archives ---
+
+def write_positions(path, snapshots, append=False):
+    """Writes (or appends) snapshot() tuples as a position archive. Returns how many."""
+    count = 0
+    with open(path, 'ab' if append else 'wb') as f:
+        if f.tell() == 0: f.write(pack_header(KIND_POSITIONS))
+        for snapshot in snapshots:
+            f.write(pack_position(snapshot))
+            count += 1
+    return count
+
+
+class PositionArchive:
+    """Read-only, memory-mapped view of a position archive.
+
+    archive[i] decodes only record i; iterating streams the records in order.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            check_header(self._data, KIND_POSITIONS, path)
+            self.count, extra = divmod(len(self._data) - HEADER.size, POSITION.size)
+            if extra: raise ValueError(f"{path} is truncated")
+        except ValueError:
+            self._data.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0: index += self.count
+        if not 0 <= index < self.count: raise IndexError("Position archive index out of range")
+        return unpack_position(self._data, HEADER.size + index * POSITION.size)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield unpack_position(self._data, HEADER.size + index * POSITION.size)
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,97 @@
+"""Per-search instrumentation for QuoridorAI.
+
+Collected only when the AI is created with collect_stats=True; otherwise the
+search skips every hook behind a single ``if stats:`` test.
+"""
+import time
+
+
+class SearchStats:
+    def __init__(self):
+        self.nodes_by_ply = []    # nodes_by_ply[p]: nodes visited p plies below the root
+        self.cutoffs = 0          # Beta cutoffs
+        self.cutoff_index = {}    # Move index the cutoff happened at -> count
+        self.tt_cutoffs = 0       # Nodes settled by a transposition entry alone
+        self.bfs_calls = 0        # Full BFS runs (distances, shortest paths, move generation's path checks)
+        self.wall_checks = 0      # Walls whose legality took a path search (not settled by cannot_disconnect)
+        self.movegen_calls = 0    # get_all_valid_moves calls (QuoridorGame caches the positions)
+        self.movegen_time = 0.0   # Seconds in get_all_valid_moves
+        self.eval_time = 0.0      # Seconds scoring positions (leaves and move ordering)
+        self.search_time = 0.0    # Seconds in the whole get_move call
+        self.iterations = []      # (depth, nodes, ms, completed) per minimax_root call
+        self.root_scores = {}
+        self.move = None
+        self._started = time.perf_counter()
+
+    @property
+    def nodes(self):
+        return sum(self.nodes_by_ply)
+
+    def node(self, ply):
+        counts = self.nodes_by_ply
+        while len(counts) <= ply:
+            counts.append(0)
+        counts[ply] += 1
+
+    def cutoff(self, index):
+        self.cutoffs += 1
+        self.cutoff_index[index] = self.cutoff_index.get(index, 0) + 1
+
+    def merge(self, other):
+        """Adds the counters of a search run elsewhere (a worker's share of the root moves)."""
+        for ply, count in enumerate(other.nodes_by_ply):
+            while len(self.nodes_by_ply) <= ply:
+                self.nodes_by_ply.append(0)
+            self.nodes_by_ply[ply] += count
+        for index, count in other.cutoff_index.items():
+            self.cutoff_index[index] = self.cutoff_index.get(index, 0) + count
+        self.cutoffs += other.cutoffs
+        self.tt_cutoffs += other.tt_cutoffs
+        self.bfs_calls += other.bfs_calls
+        self.wall_checks += other.wall_checks
+        self.movegen_calls += other.movegen_calls
+        self.movegen_time += other.movegen_time
+        self.eval_time += other.eval_time
+
+    def finish(self, move, root_scores):
+        self.move = move
+        self.root_scores = dict(root_scores)
+        self.search_time = time.perf_counter() - self._started
+
+    def effective_branching_factor(self):
+        """Geometric mean growth of the node count from one ply to the next."""
+        counts = [n for n in self.nodes_by_ply if n]
+        if len(counts) < 2: return 0.0
+        return (counts[-1] / counts[0]) ** (1 / (len(counts) - 1))
+
+    def to_dict(self):
+        other = self.search_time - self.movegen_time - self.eval_time
+        return {
+            'move': self.move,
+            'nodes': self.nodes,
+            'nodes_by_ply': list(self.nodes_by_ply),
+            'effective_branching_factor': self.effective_branching_factor(),
+            'cutoffs': self.cutoffs,
+            'cutoff_index': dict(sorted(self.cutoff_index.items())),
+            'tt_cutoffs': self.tt_cutoffs,
+            'bfs_calls': self.bfs_calls,
+            'wall_checks': self.wall_checks,
+            'movegen_calls': self.movegen_calls,
+            'time_ms': {
+                'total': self.search_time * 1000,
+                'movegen': self.movegen_time * 1000,
+                'eval': self.eval_time * 1000,
+                'recursion': max(0.0, other) * 1000,  # Tree walking, apply/undo, TT
+            },
+            'iterations': [list(it) for it in self.iterations],
+            'root_scores': {str(m): v for m, v in self.root_scores.items()},
+        }
+
+    def __str__(self):
+        d = self.to_dict()
+        t = d['time_ms']
+        first_rate = self.cutoff_index.get(0, 0) / self.cutoffs if self.cutoffs else 0.0
+        return (f"{d['nodes']} nodes (by ply {d['nodes_by_ply']}), EBF {d['effective_branching_factor']:.2f}, "
+                f"{self.cutoffs} cutoffs ({first_rate:.0%} on first move), {self.bfs_calls} BFS, "
+                f"{self.wall_checks} wall checks; {t['total']:.1f} ms = movegen {t['movegen']:.1f} + "
+                f"eval {t['eval']:.1f} + recursion {t['recursion']:.1f}")
@@ -0,0 +1,108 @@
+"""Round trips of the move-record history and the binary save format.
+
+python -m unittest test_save_format (or pytest)
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import save_format
+from game_logic import QuoridorGame
+
+
+def play_random(game, plies, rng):
+    """Plays up to plies random legal moves; returns snapshot() after each ply, the start included."""
+    positions = [game.snapshot()]
+    for _ in range(plies):
+        if game.winner: break
+        move = game.decode_move(rng.choice(game.legal_moves()))
+        player = game.current_turn
+        ok = (game.move_pawn(player, move[1], move[2]) if move[0] == 'move'
+              else game.place_wall(player, move[1], move[2], move[3]))
+        assert ok, move
+        positions.append(game.snapshot())
+    return positions
+
+
+class SaveRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.qsv')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assertSameGame(self, loaded, game):
+        self.assertEqual(loaded.snapshot(), game.snapshot())
+        self.assertEqual(loaded.history, game.history)
+        self.assertEqual(loaded.redo_stack, game.redo_stack)
+
+    def test_save_load_keeps_position_history_and_redo(self):
+        rng = random.Random(1)
+        for checkpoint_every in (0, 4, 16):
+            for plies, undos in ((0, 0), (1, 0), (30, 0), (60, 7), (120, 3)):
+                game = QuoridorGame(checkpoint_every)
+                play_random(game, plies, rng)
+                for _ in range(undos):
+                    game.undo()
+                save_format.save_game(self.path, game)
+                loaded = save_format.load_game(self.path, QuoridorGame(checkpoint_every))
+                self.assertSameGame(loaded, game)
+
+                # Redo works the same on both sides of the round trip
+                while game.redo():
+                    self.assertTrue(loaded.redo())
+                    self.assertSameGame(loaded, game)
+                self.assertFalse(loaded.redo())
+
+    def test_damaged_file_leaves_game_untouched(self):
+        game = QuoridorGame()
+        play_random(game, 20, random.Random(2))
+        data = bytearray(save_format.encode_game(game))
+        data[-1] ^= 0x40  # Last ply becomes another move
+        target = QuoridorGame()
+        play_random(target, 5, random.Random(3))
+        before = (target.snapshot(), target.history.tolist())
+        with self.assertRaises(ValueError):
+            save_format.decode_game(bytes(data), target)
+        self.assertEqual((target.snapshot(), target.history.tolist()), before)
+
+
+class PositionAtTest(unittest.TestCase):
+    def test_every_ply_matches_the_played_positions(self):
+        rng = random.Random(4)
+        for checkpoint_every in (1, 3, 8):
+            game = QuoridorGame(checkpoint_every)
+            positions = play_random(game, 80, rng)
+            for _ in range(5):
+                game.undo()  # Redo-able plies are reachable too
+            for ply, position in enumerate(positions):
+                self.assertEqual(game.position_at(ply), position)
+            with self.assertRaises(IndexError):
+                game.position_at(len(positions))
+
+    def test_new_line_after_undo_drops_stale_checkpoints(self):
+        rng = random.Random(5)
+        game = QuoridorGame(4)
+        positions = play_random(game, 40, rng)
+        for _ in range(10):
+            game.undo()
+        positions = positions[:-10] + play_random(game, 3, rng)[1:]
+        self.assertLessEqual(max(game.checkpoints), len(game.history))
+        for ply, position in enumerate(positions):
+            self.assertEqual(game.position_at(ply), position)
+
+    def test_loaded_game_answers_position_at(self):
+        rng = random.Random(6)
+        game = QuoridorGame(8)
+        positions = play_random(game, 50, rng)
+        for _ in range(4):
+            game.undo()
+        loaded = save_format.decode_game(save_format.encode_game(game), QuoridorGame(8))
+        for ply, position in enumerate(positions):
+            self.assertEqual(loaded.position_at(ply), position)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""Zobrist hashing and a bounded transposition table for the AI search.
+
+The keys are drawn from a fixed seed so a position hashes the same in every
+process (worker pools and on-disk tables rely on that).
+"""
+import random
+
+from bitboard import NUM_CELLS, WALL_GRID, cell_index, iter_bits, slot_index
+
+ZOBRIST_SEED = 472
+MAX_WALLS = 10
+
+_rng = random.Random(ZOBRIST_SEED)
+PAWN_KEYS = {p: [_rng.getrandbits(64) for _ in range(NUM_CELLS)] for p in (1, 2)}
+WALL_KEYS = {o: [_rng.getrandbits(64) for _ in range(WALL_GRID * WALL_GRID)] for o in 'HV'}
+WALLS_LEFT_KEYS = {p: [_rng.getrandbits(64) for _ in range(MAX_WALLS + 1)] for p in (1, 2)}
+TURN_KEYS = {p: _rng.getrandbits(64) for p in (1, 2)}
+del _rng
+
+# Bound types
+EXACT = 0
+LOWER_BOUND = 1  # Search failed high: true value >= stored value
+UPPER_BOUND = 2  # Search failed low: true value <= stored value
+
+
+def zobrist_hash(game):
+    """Full hash of a QuoridorGame position (pawns, walls, walls left, side to move)."""
+    key = TURN_KEYS[game.current_turn]
+    for p in (1, 2):
+        key ^= PAWN_KEYS[p][cell_index(*game.player_positions[p])]
+        key ^= WALLS_LEFT_KEYS[p][game.walls_left[p]]
+    for s in iter_bits(game.board.h_walls):
+        key ^= WALL_KEYS['H'][s]
+    for s in iter_bits(game.board.v_walls):
+        key ^= WALL_KEYS['V'][s]
+    return key
+
+
+def move_key(move, player, walls_left):
+    """XOR delta a move applies to the hash (its own inverse). Includes the turn flip."""
+    key = TURN_KEYS[1] ^ TURN_KEYS[2]
+    if move[0] == 'move':
+        key ^= PAWN_KEYS[player][cell_index(move[3], move[4])]
+        key ^= PAWN_KEYS[player][cell_index(move[1], move[2])]
+    else:
+        key ^= WALL_KEYS[move[3]][slot_index(move[1], move[2])]
+        key ^= WALLS_LEFT_KEYS[player][walls_left] ^ WALLS_LEFT_KEYS[player][walls_left - 1]
+    return key
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results.
+
+    policy='depth' keeps the deeper of two colliding entries (ties go to the
+    newer one); policy='always' lets the newest entry win. Entries survive
+    from one move's search to the next: new_search() ages them, and an
+    entry from an older search gives way to any new store.
+    """
+
+    POLICIES = ('depth', 'always')
+
+    def __init__(self, size=1 << 16, policy='depth'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.size = 1 << max(0, (size - 1).bit_length())  # Round up to a power of two
+        self.mask = self.size - 1
+        self.policy = policy
+        self.entries = [None] * self.size  # (key, depth, value, bound, best_move, generation)
+        self.generation = 0  # Bumped by new_search()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0  # Stores that evicted a different position
+
+    def probe(self, key):
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, bound, best_move):
+        index = key & self.mask
+        old = self.entries[index]
+        if old is not None and old[0] != key:
+            if self.policy == 'depth' and old[1] > depth and old[5] == self.generation: return
+            self.overwrites += 1
+        self.entries[index] = (key, depth, value, bound, best_move, self.generation)
+        self.stores += 1
+
+    def new_search(self):
+        """Ages every entry: they still answer probes, but no longer win replacements."""
+        self.generation += 1
+
+    def clear(self):
+        """Drops every entry. Counters keep accumulating until reset_stats()."""
+        self.entries = [None] * self.size
+
+    def reset_stats(self):
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'size': self.size,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'filled': sum(1 for e in self.entries if e is not None),
+            'current': sum(1 for e in self.entries if e is not None and e[5] == self.generation),
+        }